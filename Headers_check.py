@@ -1,10 +1,20 @@
+import argparse
+import json
+import os
+import re
 import requests
 import csv
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from colorama import init, Fore, Style
-from openpyxl import Workbook
-from openpyxl.styles import Font
 from urllib.parse import urljoin
-from playwright.sync_api import sync_playwright
+from header_baseline import DEFAULT_BASELINE_PATH, HeaderBaseline, diff_results, fingerprint, origin_of, save_diff
+from metrics import add_metrics_arguments, observe, start_metrics, timer
+from ratelimit import add_rate_arguments, configure_rate, polite_request
+from report_writers import open_writer
+from url_canon import canonicalize, links_from_html
 
 # Initialize colorama
 init(autoreset=True)
@@ -39,18 +49,78 @@ SECURE_HEADER_VALUES = {
     "X-XSS-Protection": "1; mode=block"
 }
 
-def fetch_headers(url):
-    try:
-        response = requests.get(url, timeout=10)
-        return response.headers
-    except requests.exceptions.RequestException as e:
-        print(f"[!] Error fetching {url}: {e}")
-        return {}
+# Report value of every header of a URL that couldn't be fetched
+FETCH_ERROR = "ERROR (fetch failed)"
+
+# Bulk mode: concurrent workers, each with its own keep-alive Session
+BULK_WORKERS = 32
+_local = threading.local()
+
+# Post-login: browser session saved here and its cookies copied into every Session
+DEFAULT_AUTH_STATE = "auth_state.json"
+_auth_cookies = requests.cookies.RequestsCookieJar()
+
+# Post-login crawl: links never followed (they would end the session), and the HTML read per page
+LOGOUT_LINK = re.compile(r"log[-_ ]?out|sign[-_ ]?out|log[-_ ]?off", re.IGNORECASE)
+MAX_HTML_BYTES = 2 * 1024 * 1024
+
+def get_session():
+    """Per-thread requests.Session; connections to a host are reused across URLs."""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=4)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.cookies.update(_auth_cookies)
+        _local.session = session
+    return session
 
-def analyze_headers(url, headers):
+def load_auth_state(path):
+    """Use the cookies of a Playwright storage_state file for every request from now on."""
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    for c in state.get("cookies", []):
+        expires = c.get("expires", -1)
+        _auth_cookies.set(
+            c["name"], c["value"], domain=c["domain"], path=c.get("path", "/"), secure=c.get("secure", False),
+            expires=int(expires) if expires and expires > 0 else None,
+            rest={"HttpOnly": None} if c.get("httpOnly") else {},
+        )
+    # Sessions made before this point don't have the cookies yet
+    _local.__dict__.pop("session", None)
+    print(f"[+] Loaded {len(_auth_cookies)} cookies from {path}")
+
+def fetch_response(url, session=None, request_headers=None):
+    """(status, headers): HEAD first, then a streamed GET whose body is never read. Status 0 on error."""
+    http = session or requests
+    with timer("fetch_headers"):
+        try:
+            response = polite_request("HEAD", url, http, headers=request_headers, timeout=10, allow_redirects=True)
+            # Some servers reject or mishandle HEAD; their GET headers are what matters
+            if response.status_code < 400:
+                return response.status_code, response.headers
+            with polite_request("GET", url, http, headers=request_headers, timeout=10, stream=True) as response:
+                return response.status_code, response.headers
+        except requests.exceptions.RequestException as e:
+            print(f"[!] Error fetching {url}: {e}")
+            return 0, {}
+
+def fetch_headers(url, session=None):
+    return fetch_response(url, session)[1]
+
+def bulk_fetch_headers(urls, workers=BULK_WORKERS):
+    """Yield (url, status, headers) in input order, fetching `workers` URLs at a time (status 0 on error)."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for url, (status, headers) in zip(urls, pool.map(lambda url: fetch_response(url, get_session()), urls)):
+            yield url, status, headers
+
+def analyze_headers(url, headers, verbose=True):
+    start = time.perf_counter()
     results = {"URL": url}
     suggested_values = []
-    print(f"\n[+] Checking headers for: {url}")
+    if verbose:
+        print(f"\n[+] Checking headers for: {url}")
     for header in HEADERS_TO_CHECK:
         value = headers.get(header, None)
         if not value:
@@ -64,10 +134,16 @@ def analyze_headers(url, headers):
         else:
             display = Fore.GREEN + value + Style.RESET_ALL
             results[header] = value
-        print(f"{header}: {display}")
+        if verbose:
+            print(f"{header}: {display}")
     results["Suggested Header Value"] = "; ".join(suggested_values)
+    observe("analyze_headers", time.perf_counter() - start)
     return results
 
+def error_result(url):
+    # A failed fetch says nothing about the headers: reported as such, never as MISSING
+    return {"URL": url, **{header: FETCH_ERROR for header in HEADERS_TO_CHECK}, "Suggested Header Value": ""}
+
 def get_urls_from_user():
     print("Enter URLs one by one. Type 'done' when finished:")
     urls = []
@@ -81,7 +157,22 @@ def get_urls_from_user():
             print("[!] URL must start with http:// or https://")
     return urls
 
-def get_post_login_urls(login_url, max_pages=50):
+def get_urls_from_file(path):
+    urls = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            url = line.strip()
+            if not url or url.startswith("#"):
+                continue
+            if not (url.startswith("http://") or url.startswith("https://")):
+                url = "https://" + url
+            urls.append(url)
+    return urls
+
+def get_post_login_urls(login_url, max_pages=50, state_path=DEFAULT_AUTH_STATE):
+    """Log in manually in a browser, save its storage_state, and return the landing page + its links."""
+    from playwright.sync_api import sync_playwright  # only needed for --login
+
     urls = []
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=False)
@@ -96,59 +187,253 @@ def get_post_login_urls(login_url, max_pages=50):
                 break
             if link.startswith("http"):
                 urls.append(link)
+        # Cookies + local storage of the logged-in session, reusable without the browser
+        page.context.storage_state(path=state_path)
+        print(f"[+] Session saved to {state_path}")
         browser.close()
+    load_auth_state(state_path)
     return urls
 
+def fetch_links(url):
+    """Same-session GET of one page; returns its links (empty for non-HTML or errors)."""
+    try:
+        with polite_request("GET", url, get_session(), timeout=10, stream=True) as response:
+            if "text/html" not in response.headers.get("Content-Type", ""):
+                return []
+            body = response.raw.read(MAX_HTML_BYTES, decode_content=True)
+            html = body.decode(response.encoding or "utf-8", errors="replace")
+            return links_from_html(response.url, html)
+    except requests.exceptions.RequestException as e:
+        print(f"[!] Error fetching {url}: {e}")
+        return []
+
+def crawl_same_origin(seeds, max_pages=50, depth=2, workers=BULK_WORKERS, roots=None):
+    """Breadth-first crawl over plain HTTP (with the loaded session cookies), one level at a time.
+
+    seeds are level 1; only pages on the origin of a root (default: every seed)
+    are expanded, and logout links are never followed. Returns the URLs found,
+    seeds first, at most max_pages of them.
+    """
+    origins = {origin_of(u) for u in (roots or seeds)}
+    found = []
+    seen = set()
+
+    def add(url, key):
+        # Deduped on the canonical form, fetched and reported as linked
+        if key not in seen and len(found) < max_pages:
+            seen.add(key)
+            found.append(url)
+            return True
+        return False
+
+    level = [u for u in seeds if add(u, canonicalize(u))]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for n in range(2, depth + 1):
+            expand = [u for u in level if origin_of(u) in origins and not LOGOUT_LINK.search(u)]
+            level = []
+            for links in pool.map(fetch_links, expand):
+                level.extend(link for link, key in links
+                             if origin_of(key) in origins and not LOGOUT_LINK.search(link) and add(link, key))
+            print(f"[+] Depth {n}: {len(level)} new pages ({len(found)}/{max_pages})")
+            if not level or len(found) >= max_pages:
+                break
+    return found
+
+# Report layout; header cells are colored as each row is written
+REPORT_COLUMNS = ["URL"] + HEADERS_TO_CHECK + ["Suggested Header Value"]
+FONT_COLORS = {
+    "missing": "FF0000",  # Red
+    "misconfigured": "FFA500",  # Orange
+    "ok": "008000",  # Green
+    "error": "808080",  # Grey
+}
+_fonts = {}
+
+def _font(status):
+    # Only .xlsx reports style cells, so openpyxl is imported on the first styled cell
+    font = _fonts.get(status)
+    if font is None:
+        from openpyxl.styles import Font
+        font = _fonts[status] = Font(color=FONT_COLORS[status])
+    return font
+
+def header_cell_font(column, value):
+    if column not in HEADERS_TO_CHECK:  # Skip URL and Suggested column
+        return None
+    if value == FETCH_ERROR:
+        return _font("error")
+    if "MISSING" in str(value):
+        return _font("missing")
+    if "MISCONFIGURED" in str(value):
+        return _font("misconfigured")
+    return _font("ok") if value else None
+
+def open_report(filename):
+    """Streaming report writer (.xlsx, .csv or .jsonl); rows are written as URLs are checked."""
+    return open_writer(filename, fieldnames=REPORT_COLUMNS, styler=header_cell_font, title="Header Scan Results")
+
+def bulk_scan(urls, writer, workers=BULK_WORKERS):
+    for done, (url, status, headers) in enumerate(bulk_fetch_headers(urls, workers), 1):
+        writer.write(analyze_headers(url, headers, verbose=False) if status else error_result(url))
+        if done % 100 == 0 or done == len(urls):
+            print(f"[+] {done}/{len(urls)} URLs checked")
+
+def incremental_scan(urls, baseline, writer, workers=BULK_WORKERS, full=False):
+    """Re-check only origins whose headers changed since the baseline; returns the diff rows.
+
+    One URL per origin is probed with a conditional request. If the checked
+    headers of its answer (a 304 included) match the baseline fingerprint, the
+    other known URLs of that origin keep their stored result; otherwise every
+    URL of the origin is fetched. URLs that can't be fetched are reported as
+    errors and keep their baseline.
+    """
+    by_origin = {}
+    for url in urls:
+        by_origin.setdefault(origin_of(url), []).append(url)
+    stored = {url: baseline.get(url) for url in urls}
+    fresh = {}  # url -> result of the URLs fetched this run
+    failed = set()
+
+    # Probe the first URL of each origin that has a baseline (validators read here: sqlite is per-thread)
+    probes = [(u[0], baseline.conditional_headers(u[0])) for u in by_origin.values()]
+
+    def probe(item):
+        url, validators = item
+        if full or stored[url] is None:
+            return url, None, None
+        status, headers = fetch_response(url, get_session(), validators)
+        return url, status, headers
+
+    def check(url, status, headers):
+        if not status:
+            failed.add(url)
+            fresh[url] = error_result(url)
+            return
+        failed.discard(url)
+        result = analyze_headers(url, headers, verbose=False)
+        baseline.put(url, headers, HEADERS_TO_CHECK, result)
+        fresh[url] = result
+
+    changed, to_fetch = [], []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for url, status, headers in pool.map(probe, probes):
+            if status is None:
+                unchanged = False  # not probed: no baseline, or a full scan
+            elif status == 304:
+                # Headers missing from the 304 alter the fingerprint, so the probe URL is fetched in full
+                unchanged = fingerprint(headers, HEADERS_TO_CHECK) == stored[url][0]
+            else:
+                # A failed probe is reported once, not fetched again with the rest of its origin
+                check(url, status, headers)
+                unchanged = bool(status) and fingerprint(headers, HEADERS_TO_CHECK) == stored[url][0]
+            if not unchanged:
+                changed.append(origin_of(url))
+            to_fetch.extend(u for u in by_origin[origin_of(url)]
+                            if u not in fresh and (not unchanged or stored[u] is None))
+    for url, status, headers in bulk_fetch_headers(to_fetch, workers):
+        check(url, status, headers)
+    print(f"[+] {len(by_origin) - len(changed)} origins unchanged, {len(changed)} re-checked "
+          f"({len(fresh) - len(failed)}/{len(urls)} URLs fetched)")
+    if failed:
+        print(f"[!] {len(failed)} URLs could not be fetched; their baseline is kept")
+
+    diff = []
+    for url in urls:
+        result = fresh[url] if url in fresh else stored[url][1]
+        if url not in failed:
+            diff.extend(diff_results(stored[url][1] if stored[url] else None, result, HEADERS_TO_CHECK))
+        writer.write(result)
+    return diff
+
+def print_diff(diff):
+    if not diff:
+        print("\n[✔] No header changes since the baseline")
+        return
+    colors = {"REGRESSED": Fore.RED, "NEW": Fore.YELLOW, "CHANGED": Fore.YELLOW, "FIXED": Fore.GREEN}
+    print(f"\n[+] {len(diff)} header changes since the baseline:")
+    for row in diff:
+        before = f"{row['Before']} -> " if row["Before"] else ""
+        print(colors[row["Change"]] + f"{row['Change']:<9}" + Style.RESET_ALL
+              + f" {row['URL']} {row['Header']}: {before}{row['After']}")
+
 def main():
-    choice = input("Choose scan type (1=Pre-login, 2=Post-login): ").strip()
-    all_results = []
-
-    if choice == "1":
-        urls = get_urls_from_user()
-    elif choice == "2":
-        login_url = input("Enter login page URL: ").strip()
-        max_pages = input("Enter max pages to crawl: ").strip()
-        max_pages = int(max_pages) if max_pages.isdigit() else 50
-        urls = get_post_login_urls(login_url, max_pages)
+    parser = argparse.ArgumentParser(description="Check security headers")
+    parser.add_argument("--bulk", metavar="FILE", help="scan every URL in FILE (one per line) concurrently")
+    parser.add_argument("--workers", type=int, default=BULK_WORKERS, help="concurrent requests in bulk mode")
+    parser.add_argument("--baseline", nargs="?", const=DEFAULT_BASELINE_PATH, metavar="PATH",
+                        help=f"compare against (and update) a stored baseline (default {DEFAULT_BASELINE_PATH}); "
+                             "only origins whose headers changed are re-checked")
+    parser.add_argument("--full", action="store_true", help="with --baseline: re-check every URL")
+    parser.add_argument("-o", "--output", help="report file (.xlsx, .csv or .jsonl); default depends on the scan type")
+    parser.add_argument("--auth-state", metavar="PATH",
+                        help="Playwright storage_state whose cookies are sent with every request "
+                             f"(post-login scans save it, default {DEFAULT_AUTH_STATE})")
+    parser.add_argument("--depth", type=int, default=1,
+                        help="follow same-origin links this many levels deep over HTTP (1 = given URLs only)")
+    parser.add_argument("--max-pages", type=int, default=50, help="page limit for --depth crawling")
+    add_rate_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    configure_rate(max_rate=args.max_rate, min_rate=args.min_rate)
+    start_metrics(args)
+
+    if args.auth_state and os.path.exists(args.auth_state):
+        load_auth_state(args.auth_state)
+    elif args.auth_state and args.bulk:
+        parser.error(f"--auth-state: {args.auth_state} not found (a post-login scan creates it)")
+
+    bulk = bool(args.bulk)
+    report = "headers_report_bulk.xlsx"
+    depth, max_pages, roots = args.depth, args.max_pages, None
+    if bulk:
+        urls = get_urls_from_file(args.bulk)
     else:
-        print("[!] Invalid choice. Exiting.")
-        return
+        choice = input("Choose scan type (1=Pre-login, 2=Post-login, 3=Bulk from file): ").strip()
+        if choice == "1":
+            urls = get_urls_from_user()
+            report = "headers_report_post_login.xlsx"
+        elif choice == "2":
+            login_url = input("Enter login page URL: ").strip()
+            max_pages = input("Enter max pages to crawl: ").strip()
+            max_pages = int(max_pages) if max_pages.isdigit() else 50
+            depth = input("Crawl depth (1 = links on the landing page only): ").strip()
+            depth = int(depth) if depth.isdigit() else args.depth
+            urls = get_post_login_urls(login_url, max_pages, args.auth_state or DEFAULT_AUTH_STATE)
+            roots = urls[:1]  # only the logged-in site is crawled deeper
+            # Checked concurrently with the browser's cookies instead of unauthenticated requests
+            bulk = True
+            report = "headers_report_post_login.xlsx"
+        elif choice == "3":
+            urls = get_urls_from_file(input("Enter path to URL file: ").strip())
+            bulk = True
+        else:
+            print("[!] Invalid choice. Exiting.")
+            return
+
+    if urls and depth > 1:
+        urls = crawl_same_origin(urls, max_pages, depth, args.workers, roots)
 
     if not urls:
         print("[!] No URLs to scan. Exiting.")
         return
 
-    for url in urls:
-        headers = fetch_headers(url)
-        result = analyze_headers(url, headers)
-        all_results.append(result)
-
-    # Save to Excel
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Header Scan Results"
-    columns = ["URL"] + HEADERS_TO_CHECK + ["Suggested Header Value"]
-    ws.append(columns)
-
-    for row in all_results:
-        excel_row = []
-        for col in columns:
-            val = row.get(col, "")
-            excel_row.append(val)
-        ws.append(excel_row)
-    
-    # Color text in cells
-    for row in ws.iter_rows(min_row=2):
-        for cell in row[1:-1]:  # Skip URL and Suggested column
-            if "MISSING" in str(cell.value):
-                cell.font = Font(color="FF0000")  # Red
-            elif "MISCONFIGURED" in str(cell.value):
-                cell.font = Font(color="FFA500")  # Orange
-            elif cell.value:
-                cell.font = Font(color="008000")  # Green
-
-    wb.save("headers_report_post_login.xlsx")
-    print("\n[✔] All results saved to headers_report_post_login.xlsx")
+    # Rows are written as they are produced; nothing is kept for a second pass
+    report = args.output or report
+    with open_report(report) as writer:
+        if args.baseline:
+            with HeaderBaseline(args.baseline) as baseline:
+                diff = incremental_scan(urls, baseline, writer, args.workers, args.full)
+            print_diff(diff)
+            save_diff(diff)
+            print("[✔] Changes saved to headers_diff.csv")
+        elif bulk:
+            bulk_scan(urls, writer, args.workers)
+        else:
+            session = get_session()
+            for url in urls:
+                status, headers = fetch_response(url, session)
+                writer.write(analyze_headers(url, headers) if status else error_result(url))
+    print(f"\n[✔] All results saved to {report}")
 
 if __name__ == "__main__":
     main()
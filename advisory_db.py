@@ -0,0 +1,241 @@
+"""Offline advisory store built from an OSV / GitHub-advisory JSON dump.
+
+    python advisory_db.py import npm-all.zip            # or a directory / .json file
+    python advisory_db.py query jquery 3.4.0
+"""
+import argparse
+import gzip
+import json
+import os
+import zipfile
+from bisect import bisect_left
+from functools import lru_cache
+
+from packaging import version  # pip install packaging
+
+DEFAULT_INDEX_PATH = "advisories.idx.json.gz"
+INDEX_FORMAT = 1
+
+# Detector library names -> package names in the advisory ecosystem
+PACKAGE_NAMES = {
+    "jQuery": "jquery",
+    "jQuery UI": "jquery-ui",
+    "jQuery Migrate": "jquery-migrate",
+    "AngularJS": "angular",
+    "Angular": "@angular/core",
+    "Moment.js": "moment",
+    "Chart.js": "chart.js",
+    "Three.js": "three",
+    "Hammer.js": "hammerjs",
+    "Next.js": "next",
+}
+
+
+@lru_cache(maxsize=None)
+def parse_version(ver):
+    """Memoized version.parse; None for strings packaging can't order."""
+    try:
+        return version.parse(ver)
+    except version.InvalidVersion:
+        return None
+
+
+def package_name(lib):
+    return PACKAGE_NAMES.get(lib, lib.lower())
+
+
+# -------------------
+# Import
+# -------------------
+def iter_osv_records(path):
+    """Yield OSV advisory dicts from a .zip, a directory of .json files, or one .json file."""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            for name in zf.namelist():
+                if name.endswith(".json"):
+                    yield from _records(json.loads(zf.read(name)))
+    elif os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            for name in files:
+                if name.endswith(".json"):
+                    with open(os.path.join(root, name), encoding="utf-8") as f:
+                        yield from _records(json.load(f))
+    else:
+        with open(path, encoding="utf-8") as f:
+            yield from _records(json.load(f))
+
+
+def _records(data):
+    if isinstance(data, list):
+        yield from data
+    else:
+        yield data
+
+
+def _affected_spans(affected):
+    """(introduced, end, end_inclusive) spans for one affected entry; None means unbounded."""
+    spans = []
+    for rng in affected.get("ranges", []):
+        if rng.get("type") not in ("SEMVER", "ECOSYSTEM"):
+            continue
+        start = None
+        for event in rng.get("events", []):
+            if "introduced" in event:
+                start = None if event["introduced"] == "0" else event["introduced"]
+                spans.append([start, None, False])
+            elif "fixed" in event and spans:
+                spans[-1][1:] = [event["fixed"], False]
+            elif "last_affected" in event and spans:
+                spans[-1][1:] = [event["last_affected"], True]
+    for ver in affected.get("versions", []):
+        spans.append([ver, ver, True])
+    return spans
+
+
+def build_index(records, ecosystem="npm"):
+    """Turn OSV records into per-package sorted boundaries with precomputed coverage.
+
+    For a package with sorted boundary versions b0 < b1 < ... < bn-1 there are
+    2n+1 slots: gap before b0, b0, gap, b1, ..., gap after bn-1. Each slot stores
+    the advisories covering it, so a lookup is one bisect.
+    """
+    advisories = []
+    spans_by_pkg = {}
+    for record in records:
+        if record.get("withdrawn"):
+            continue
+        adv_idx = None
+        for affected in record.get("affected", []):
+            pkg = affected.get("package", {})
+            if pkg.get("ecosystem", "").lower() != ecosystem.lower():
+                continue
+            spans = [s for s in _affected_spans(affected)
+                     if all(v is None or parse_version(v) is not None for v in s[:2])]
+            if not spans:
+                continue
+            if adv_idx is None:
+                adv_idx = len(advisories)
+                advisories.append({
+                    "id": record.get("id"),
+                    "aliases": [a for a in record.get("aliases", []) if a.startswith("CVE-")],
+                    "summary": record.get("summary", ""),
+                })
+            spans_by_pkg.setdefault(pkg["name"].lower(), []).extend((adv_idx, s) for s in spans)
+
+    packages = {}
+    for name, spans in spans_by_pkg.items():
+        bounds = sorted({v for _, s in spans for v in s[:2] if v is not None}, key=parse_version)
+        # Collapse strings that parse to the same version ("1.0" / "1.0.0")
+        unique = []
+        for b in bounds:
+            if not unique or parse_version(unique[-1]) != parse_version(b):
+                unique.append(b)
+        pos = {parse_version(b): i for i, b in enumerate(unique)}
+        slots = [set() for _ in range(2 * len(unique) + 1)]
+        for adv_idx, (start, end, inclusive) in spans:
+            first = 0 if start is None else 2 * pos[parse_version(start)] + 1
+            if end is None:
+                last = len(slots) - 1
+            else:
+                last = 2 * pos[parse_version(end)] + (1 if inclusive else 0)
+            for slot in range(first, last + 1):
+                slots[slot].add(adv_idx)
+        packages[name] = {"bounds": unique, "slots": [sorted(s) for s in slots]}
+    return {"format": INDEX_FORMAT, "ecosystem": ecosystem, "advisories": advisories, "packages": packages}
+
+
+def save_index(index, path=DEFAULT_INDEX_PATH):
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"))
+
+
+# -------------------
+# Lookup
+# -------------------
+class AdvisoryDB:
+    def __init__(self, index):
+        self.advisories = index["advisories"]
+        self._packages = index["packages"]
+        self._bounds = {}  # package -> parsed boundary list, built on first lookup
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_PATH):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("format") != INDEX_FORMAT:
+            raise ValueError(f"{path}: unsupported index format {index.get('format')}")
+        return cls(index)
+
+    def lookup(self, lib, ver):
+        """Advisories covering library `lib` at version `ver` (O(log n) per package)."""
+        name = package_name(lib)
+        pkg = self._packages.get(name)
+        parsed = parse_version(ver) if ver else None
+        if pkg is None or parsed is None:
+            return []
+        bounds = self._bounds.get(name)
+        if bounds is None:
+            bounds = self._bounds[name] = [parse_version(b) for b in pkg["bounds"]]
+        i = bisect_left(bounds, parsed)
+        slot = 2 * i + 1 if i < len(bounds) and bounds[i] == parsed else 2 * i
+        return [self.advisories[a] for a in pkg["slots"][slot]]
+
+    def vulnerability_ids(self, lib, ver):
+        """CVE ids where known, otherwise the advisory id (GHSA-/OSV id)."""
+        ids = []
+        for adv in self.lookup(lib, ver):
+            for vid in adv["aliases"] or [adv["id"]]:
+                if vid not in ids:
+                    ids.append(vid)
+        return ids
+
+
+_default_db = None
+
+
+def default_db(path=DEFAULT_INDEX_PATH):
+    """The index at `path` loaded once per process, or None when it hasn't been imported."""
+    global _default_db
+    if _default_db is None and os.path.exists(path):
+        _default_db = AdvisoryDB.load(path)
+    return _default_db
+
+
+def index_fingerprint(path=DEFAULT_INDEX_PATH):
+    """Cheap identity of the on-disk index, used to expire cached detections when it changes."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, int(st.st_mtime)]
+
+
+# -------------------
+# CLI
+# -------------------
+def main():
+    parser = argparse.ArgumentParser(description="Offline OSV / GitHub advisory index")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    imp = sub.add_parser("import", help="build the index from an OSV JSON dump")
+    imp.add_argument("dump", help="OSV .zip, directory of .json files, or a .json file")
+    imp.add_argument("-o", "--output", default=DEFAULT_INDEX_PATH)
+    imp.add_argument("--ecosystem", default="npm")
+    query = sub.add_parser("query", help="list advisories for a package version")
+    query.add_argument("package")
+    query.add_argument("version")
+    query.add_argument("-i", "--index", default=DEFAULT_INDEX_PATH)
+    args = parser.parse_args()
+
+    if args.cmd == "import":
+        index = build_index(iter_osv_records(args.dump), ecosystem=args.ecosystem)
+        save_index(index, args.output)
+        print(f"✅ Indexed {len(index['advisories'])} advisories for "
+              f"{len(index['packages'])} packages into {args.output}")
+    else:
+        db = AdvisoryDB.load(args.index)
+        for adv in db.lookup(args.package, args.version):
+            print(f"{adv['id']} {','.join(adv['aliases'])} {adv['summary']}")
+
+
+if __name__ == "__main__":
+    main()
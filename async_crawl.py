@@ -0,0 +1,215 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+import aiohttp  # pip install aiohttp
+
+from frontier import MemoryFrontier
+from html_extract import extract_page
+from bundle_scan import BundleScanner, open_scanner
+from lib_matcher import SCAN_WINDOW
+from metrics import count, gauge, observe, timer
+from ratelimit import MAX_RETRIES, RETRY_STATUSES, default_limiter
+from script_cache import scan_result
+from url_canon import canonicalize, internal_links
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+
+# -------------------
+# Concurrency limits
+# -------------------
+class HostLimiter:
+    """Caps in-flight requests globally and per host."""
+
+    def __init__(self, concurrency=20, per_host=4):
+        self.per_host = per_host
+        self._global = asyncio.Semaphore(concurrency)
+        self._hosts = {}
+
+    @asynccontextmanager
+    async def slot(self, url):
+        host = urlparse(url).netloc
+        host_sem = self._hosts.get(host)
+        if host_sem is None:
+            host_sem = self._hosts[host] = asyncio.Semaphore(self.per_host)
+        # Take the host slot first so a slow host can't hog global slots
+        async with host_sem:
+            async with self._global:
+                yield
+
+
+# -------------------
+# Async crawler
+# -------------------
+class AsyncCrawler:
+    def __init__(self, concurrency=20, per_host=4, page_timeout=10, script_timeout=5, cache=None, rate=None):
+        self.concurrency = concurrency
+        self.cache = cache
+        self._inflight = {}
+        self.limiter = HostLimiter(concurrency, per_host)
+        self.rate = rate or default_limiter()
+        self.page_timeout = aiohttp.ClientTimeout(total=page_timeout)
+        self.script_timeout = aiohttp.ClientTimeout(total=script_timeout)
+        self.session = None
+
+    @asynccontextmanager
+    async def get(self, url, **kwargs):
+        """session.get within the host's concurrency slot and rate; 429/503 are retried after backing off."""
+        for attempt in range(MAX_RETRIES + 1):
+            await self.rate.wait_async(url)
+            async with self.limiter.slot(url):
+                start = time.monotonic()
+                try:
+                    resp = await self.session.get(url, **kwargs)
+                except (asyncio.TimeoutError, aiohttp.ClientConnectionError) as e:
+                    self.rate.record(url, error=True)
+                    count("http_errors", error=type(e).__name__)
+                    raise
+                latency = time.monotonic() - start
+                self.rate.record(url, resp.status, latency, resp.headers.get("Retry-After"))
+                observe("http", latency)
+                count("http_requests", method="GET", status=resp.status)
+                if resp.status in RETRY_STATUSES and attempt < MAX_RETRIES:
+                    resp.release()
+                    continue
+                try:
+                    yield resp
+                finally:
+                    resp.release()
+                return
+
+    async def fetch_page(self, url):
+        with timer("fetch_page"):
+            async with self.get(url, timeout=self.page_timeout) as resp:
+                if "text/html" not in resp.headers.get("Content-Type", ""):
+                    return None, None
+                html = await resp.text(errors="replace")
+                count("bytes", resp.content.total_bytes, kind="page")
+                return html, str(resp.url)
+
+    async def fetch_and_scan(self, url, matcher, describe):
+        """Async script_cache.fetch_and_scan; concurrent calls for one URL share a single fetch."""
+        if self.cache is not None:
+            result = self.cache.cached(url)
+            if result is not None:
+                return result
+        task = self._inflight.get(url)
+        if task is None:
+            task = self._inflight[url] = asyncio.ensure_future(self._fetch_and_scan(url, matcher, describe))
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def _fetch_and_scan(self, url, matcher, describe):
+        with timer("fetch_script"):
+            cache = self.cache
+            headers = cache.conditional_headers(url) if cache is not None else {}
+            try:
+                async with self.get(url, timeout=self.script_timeout, headers=headers) as resp:
+                    if resp.status == 304 and cache is not None:
+                        return cache.not_modified(url, resp.headers)
+                    if resp.status >= 400 or "javascript" not in resp.headers.get("Content-Type", ""):
+                        return None
+                    scanner = open_scanner(matcher, encoding=resp.charset, url=url)
+                    async for chunk in resp.content.iter_chunked(SCAN_WINDOW):
+                        if scanner.feed(chunk):
+                            sha = None  # stopped early: the digest would only cover part of the body
+                            break
+                    else:
+                        sha = scanner.sha256
+            except Exception:
+                return None
+            if isinstance(scanner, BundleScanner) and scanner.bundle:
+                # Waits on the bundle pool (and may fetch a source map); keep the event loop free
+                result = await asyncio.get_running_loop().run_in_executor(None, scan_result, scanner, describe)
+            else:
+                result = scan_result(scanner, describe)
+            if cache is not None:
+                cache.store(url, resp.headers, sha, result)
+            return result
+
+    async def crawl(self, start_url, max_pages, process_page, fetch_page=None, frontier=None):
+        """BFS over same-domain links; process_page(crawler, url, parsed) returns result rows.
+
+        parsed is the html_extract.Page (scripts and links) of the fetched HTML.
+        fetch_page(url) -> (html or None, final URL) replaces the HTTP page fetch (e.g. a browser navigation);
+        relative links and scripts resolve against the final URL, after redirects.
+        frontier defaults to an in-memory one; pass a SqliteFrontier to make the crawl resumable.
+        """
+        fetch_page = fetch_page or self.fetch_page
+        frontier = frontier if frontier is not None else MemoryFrontier()
+        # Pages are fetched as linked; the canonical form only dedupes the frontier
+        start_key = canonicalize(start_url)
+        frontier.push(start_url, start_key)
+        domain = urlparse(start_key).netloc
+        in_flight = 0
+        changed = asyncio.Condition()
+
+        async def next_url():
+            nonlocal in_flight
+            async with changed:
+                while frontier.visited_count() < max_pages:
+                    url = frontier.pop()
+                    if url is not None:
+                        in_flight += 1
+                        return url
+                    if in_flight == 0:
+                        break  # queue drained and nothing left that could add to it
+                    await changed.wait()
+                changed.notify_all()
+                return None
+
+        async def visit(url):
+            rows = []
+            try:
+                html, served_url = await fetch_page(url)
+            except Exception as e:
+                print(f"Request failed for {url}: {e}")
+                return rows
+            if html is None:
+                return rows
+
+            with timer("parse"):
+                parsed = extract_page(html, served_url or url)
+            try:
+                with timer("process_page"):
+                    rows = await process_page(self, url, parsed)
+            except Exception as e:
+                print(f"Detection failed for {url}: {e}")
+
+            for link, key in internal_links(url, parsed.links, domain):
+                frontier.push(link, key)
+            gauge("frontier_queued", frontier.queued_count())
+            return rows
+
+        async def worker():
+            nonlocal in_flight
+            while True:
+                url = await next_url()
+                if url is None:
+                    return
+                print(f"[{frontier.visited_count()}/{max_pages}] Visiting: {url}")
+                gauge("pages_in_flight", in_flight)
+                count("pages")
+                try:
+                    # Not completed if cancelled, so a resumed crawl visits it again
+                    with timer("page"):
+                        rows = await visit(url)
+                    frontier.complete(url, rows)
+                finally:
+                    async with changed:
+                        in_flight -= 1
+                        changed.notify_all()
+
+        async with aiohttp.ClientSession(headers={"User-Agent": USER_AGENT}) as session:
+            self.session = session
+            workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                for w in workers:
+                    w.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                self.session = None
+        return frontier.results()
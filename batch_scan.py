@@ -0,0 +1,196 @@
+"""Scan many start URLs in one non-interactive run.
+
+    python batch_scan.py targets.txt --workers 8 --max-pages 200 -o batch_findings.csv
+
+Targets are grouped by registered domain and each group runs in one worker
+process, one target after another, so a host is never crawled by two workers
+at once and the per-host limits of the crawler still hold.
+"""
+import argparse
+import hashlib
+import importlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from bundle_scan import add_bundle_arguments, configure_bundles
+from escalation import Escalator, add_escalation_arguments
+from frontier import open_frontier
+from metrics import add_metrics_arguments, default_metrics, start_metrics
+from ratelimit import add_rate_arguments, configure_rate
+from report_writers import open_writer
+from script_cache import DEFAULT_CACHE_PATH, ScriptCache
+from url_canon import registered_domain
+
+# Workers come from a fork server (spawned where there is none): forking after the metrics threads started can deadlock
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# Tool name -> module providing DETECTOR, run_crawl() and new_inventory()
+TOOLS = {
+    "vulnlibs": "vulnlibs_detect",
+    "deeper": "crawl_detect_libs_deeper",
+}
+
+
+def read_targets(path):
+    """Start URLs from a file: one per line, blank lines and # comments ignored."""
+    targets = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            url = line.split("#", 1)[0].strip()
+            if not url:
+                continue
+            if "://" not in url:
+                url = "https://" + url
+            if url not in targets:
+                targets.append(url)
+    return targets
+
+
+def shard_by_domain(targets):
+    """Group targets by registered domain; biggest shards first so they start early."""
+    shards = {}
+    for url in targets:
+        shards.setdefault(registered_domain(url), []).append(url)
+    return sorted(shards.values(), key=len, reverse=True)
+
+
+def state_path(state_dir, url):
+    return os.path.join(state_dir, hashlib.sha1(url.encode()).hexdigest()[:16] + ".sqlite")
+
+
+# -------------------
+# Worker
+# -------------------
+def scan_shard(tool, targets, options):
+    """Crawl each target of one shard in this process.
+
+    Returns (inventory, [(url, pages, rows, secs, error)], metrics): the shard's findings aggregated
+    per target, and its metrics.export_state(). Rows are aggregated here, so they never pile up.
+    """
+    module = importlib.import_module(TOOLS[tool])
+    # Worker processes are reused across shards: start each shard from zero so nothing is merged twice
+    default_metrics().reset()
+    configure_rate(**options["rate"])
+    configure_bundles(**options["bundles"])
+    extra = {"single_nav": options["single_nav"]} if tool == "vulnlibs" else {}
+    inventory = module.new_inventory(keep_pages=options["per_page"], group_by="target")
+    summary = []
+    # The cache file is shared by all workers, so a CDN script is scanned once per batch
+    with ScriptCache(options["cache"], detector=module.DETECTOR) as cache:
+        for url in targets:
+            path = state_path(options["state_dir"], url) if options["state_dir"] else None
+            try:
+                frontier, url, max_pages = open_frontier(path, url, options["max_pages"], writer=inventory)
+            except ValueError as e:
+                print(f"❌ {url}: {e}")
+                summary.append((url, 0, 0, 0.0, str(e)))
+                continue
+            inventory.group = url
+            rows_before = inventory.rows
+            start = time.monotonic()
+            escalator = Escalator(samples=options["template_samples"]) if options["tiered"] else None
+            try:
+                module.run_crawl(url, max_pages=max_pages, use_async=options["use_async"],
+                                 cache=cache, frontier=frontier, escalator=escalator, **extra)
+                error = ""
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                print(f"❌ {url}: {error}")
+            if path:
+                # State files keep their rows (earlier runs' included) until exported
+                inventory.write_rows(frontier.iter_results())
+            pages = frontier.visited_count()
+            frontier.close()
+            summary.append((url, pages, inventory.rows - rows_before, time.monotonic() - start, error))
+    return inventory, summary, default_metrics().export_state()
+
+
+# -------------------
+# Main
+# -------------------
+def main():
+    parser = argparse.ArgumentParser(description="Batch library detection over a file of start URLs")
+    parser.add_argument("targets", help="file with one start URL per line")
+    parser.add_argument("--tool", choices=sorted(TOOLS), default="vulnlibs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes, each with its own crawler and browser (default: CPU count)")
+    parser.add_argument("--max-pages", type=int, default=50, help="page budget per target")
+    parser.add_argument("--sequential", action="store_true", help="use the sequential crawl inside each worker")
+    parser.add_argument("--single-nav", action="store_true", help="vulnlibs only: browser fetches page + scripts once")
+    parser.add_argument("--state-dir", help="keep one resumable frontier per target here; rerunning continues them")
+    add_rate_arguments(parser)
+    add_bundle_arguments(parser)
+    add_escalation_arguments(parser)
+    add_metrics_arguments(parser)
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="script cache shared by all workers")
+    parser.add_argument("-o", "--output", default="batch_findings.csv",
+                        help=".csv, .jsonl or .xlsx (one row per target, library, version and script)")
+    parser.add_argument("--per-page", action="store_true",
+                        help="report one row per page, script and library instead of the aggregated inventory")
+    args = parser.parse_args()
+    if args.tiered and args.single_nav:
+        parser.error("--tiered and --single-nav don't combine (single-nav renders every page)")
+    # Workers' metrics are merged in as their shards finish; --profile/--sample cover this process only
+    start_metrics(args)
+
+    targets = read_targets(args.targets)
+    if not targets:
+        print("No targets found. Exiting.")
+        return
+    shards = shard_by_domain(targets)
+    workers = max(1, min(args.workers, len(shards)))
+    if args.state_dir:
+        os.makedirs(args.state_dir, exist_ok=True)
+    options = {
+        "max_pages": args.max_pages,
+        "use_async": not args.sequential,
+        "single_nav": args.single_nav,
+        "tiered": args.tiered,
+        "template_samples": args.template_samples,
+        "per_page": args.per_page,
+        "state_dir": args.state_dir,
+        "cache": args.cache,
+        "rate": {"max_rate": args.max_rate, "min_rate": args.min_rate},
+        # The targets already use every core, so bundles scan inside each worker unless asked otherwise
+        "bundles": {"workers": args.bundle_workers or 1, "source_maps": args.source_maps},
+    }
+
+    print(f"Scanning {len(targets)} targets ({len(shards)} domains) with {workers} workers. "
+          f"Ensure permission to scan every target.")
+    started = time.monotonic()
+    summary = []
+    # Each shard's inventory is merged in as soon as it finishes; only distinct findings accumulate here
+    inventory = importlib.import_module(TOOLS[args.tool]).new_inventory(keep_pages=args.per_page, group_by="target")
+    context = multiprocessing.get_context(START_METHOD)
+    with open_writer(args.output) as writer, ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = {pool.submit(scan_shard, args.tool, shard, options): shard for shard in shards}
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                shard_inventory, shard_summary, shard_metrics = future.result()
+                inventory.merge(shard_inventory)
+                default_metrics().merge(shard_metrics)
+            except Exception as e:
+                # The worker process itself died; record every target of the shard
+                shard_summary = [(url, 0, 0, 0.0, f"worker failed: {e}") for url in futures[future]]
+            summary.extend(shard_summary)
+            print(f"[{done}/{len(shards)}] domains finished ({len(summary)}/{len(targets)} targets)")
+        inventory.export(writer, per_page=args.per_page)
+
+    elapsed = time.monotonic() - started
+    pages = sum(s[1] for s in summary)
+    print("\nTargets:")
+    for url, target_pages, target_rows, secs, error in sorted(summary):
+        note = f" ({error})" if error else ""
+        print(f"{'❌' if error else '✅'} {url}: {target_pages} pages, {target_rows} rows in {secs:.0f}s{note}")
+    print(f"\n{len(targets)} targets, {pages} pages in {elapsed:.0f}s ({pages / max(elapsed, 1e-9):.1f} pages/s)")
+    print(f"📦 Inventory: {inventory.summary()}")
+    if writer.rows:
+        print(f"✅ {writer.rows} results saved to {args.output}")
+    else:
+        print("⚠️ No findings to save.")
+
+
+if __name__ == "__main__":
+    main()
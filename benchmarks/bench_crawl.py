@@ -0,0 +1,272 @@
+"""End-to-end benchmark on a local synthetic site: crawl + header scan, then microbenchmarks.
+
+    python benchmarks/bench_crawl.py [--pages 200] [--tool vulnlibs] [--sequential] [--runs 2]
+
+The site (see synthetic_site.py) is generated from a seed and served on
+127.0.0.1, so results are comparable between commits and no network is used.
+Costs (requests, bytes, duplicate fetches) are counted by the server; detection
+quality is scored against the libraries each page is known to load.
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_detect import minified_bundle, timed
+from escalation import Escalator
+from frontier import MemoryFrontier
+from html_extract import BACKENDS, extract_page
+from ratelimit import configure_rate
+from report_writers import open_writer
+from script_cache import ScriptCache
+from synthetic_site import HEADER_PROFILES, LIBRARIES, build_site, filler, library_script, serve
+import crawl_detect_libs_deeper
+import Headers_check
+import vulnlibs_detect
+
+TOOLS = {
+    "vulnlibs": vulnlibs_detect,
+    "deeper": crawl_detect_libs_deeper,
+}
+
+
+def page_findings(rows):
+    """{page path: {library: {versions}}} from result rows' findings; None stands for "no version"."""
+    found = {}
+    for row in rows:
+        libs = found.setdefault(urlsplit(row["page_url"]).path or "/", {})
+        for lib, version, _ in row["findings"]:
+            libs.setdefault(lib, set()).add(version)
+    return found
+
+
+def score(truth, rows):
+    """Precision/recall per (page, library), and per (page, library, version)."""
+    found = page_findings(rows)
+    predicted = correct = versioned = versioned_correct = 0
+    for page, libs in found.items():
+        expected = dict(truth.get(page, ()))
+        for lib, versions in libs.items():
+            predicted += 1
+            correct += lib in expected
+            versions.discard(None)
+            if versions:
+                versioned += 1
+                versioned_correct += versions == {expected.get(lib)}
+    relevant = sum(len(libs) for libs in truth.values())
+    lib_hits = version_hits = 0
+    for page, libs in truth.items():
+        seen = found.get(page, {})
+        for lib, version in libs:
+            lib_hits += lib in seen
+            version_hits += version in seen.get(lib, ())
+    return {
+        "library_precision": correct / max(predicted, 1),
+        "library_recall": lib_hits / max(relevant, 1),
+        "version_precision": versioned_correct / max(versioned, 1),
+        "version_recall": version_hits / max(relevant, 1),
+    }
+
+
+def quiet(verbose):
+    return redirect_stdout(sys.stdout if verbose else io.StringIO())
+
+
+# -------------------
+# End-to-end
+# -------------------
+def bench_crawl(module, server, site, args, cache):
+    server.stats.reset()
+    frontier = MemoryFrontier()
+    extra = {"single_nav": args.single_nav} if module is vulnlibs_detect else {}
+    escalator = Escalator(samples=args.template_samples) if args.tiered else None
+    start = time.perf_counter()
+    with quiet(args.verbose):
+        rows = module.run_crawl(server.url, max_pages=args.pages, use_async=not args.sequential, cache=cache,
+                                frontier=frontier, escalator=escalator, **extra)
+    elapsed = time.perf_counter() - start
+    stats = server.stats
+    pages = frontier.visited_count()
+    # Without --tiered every page gets one browser visit
+    rendered = escalator.decisions["browser"] if escalator else pages
+    scripts = stats.fetched(site.script_paths)
+    print(f"  {pages} pages in {elapsed:.2f}s: {pages / elapsed:.1f} pages/s, {scripts / elapsed:.1f} scripts/s, "
+          f"{stats.requests} requests, {stats.bytes_sent / 1e6:.1f} MB, "
+          f"{stats.duplicate_fetches()} duplicate fetches, {stats.not_modified} revalidated (304)")
+    quality = score(site.truth, rows)
+    print(f"  detection: library precision {quality['library_precision']:.3f} recall {quality['library_recall']:.3f}"
+          f" | version precision {quality['version_precision']:.3f} recall {quality['version_recall']:.3f}")
+    print(f"  browser: {rendered} of {pages} pages rendered" + (f" ({escalator.summary()})" if escalator else ""))
+    report_sizes(module, rows)
+
+
+def report_sizes(module, rows):
+    """Result rows vs inventory records, and the CSV each report view produces."""
+    inventory = module.new_inventory(keep_pages=True)
+    inventory.write_rows(rows)
+    sizes = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for view, write in (("rows", lambda w: w.write_rows(rows)),
+                            ("inventory", inventory.export),
+                            ("per-page", lambda w: inventory.export(w, per_page=True))):
+            path = os.path.join(tmp, f"{view}.csv")
+            with open_writer(path) as writer:
+                write(writer)
+            sizes[view] = (writer.rows, os.path.getsize(path) if writer.rows else 0)
+    print(f"  report: {inventory.summary()}; CSV "
+          + ", ".join(f"{view} {n} rows / {size / 1024:.0f} KB" for view, (n, size) in sizes.items()))
+
+
+def bench_headers(server, site, args):
+    server.stats.reset()
+    base = server.url.rstrip("/")
+    urls = [base + path for path in site.page_paths]
+    start = time.perf_counter()
+    with quiet(args.verbose):
+        results = [Headers_check.analyze_headers(url, headers, verbose=False)
+                   for url, _, headers in Headers_check.bulk_fetch_headers(urls, args.workers)]
+    elapsed = time.perf_counter() - start
+    missing = sum(value == "MISSING" for row in results for value in row.values())
+    stats = server.stats
+    print(f"  {len(results)} URLs in {elapsed:.2f}s: {len(results) / elapsed:.1f} URLs/s, "
+          f"{stats.requests} requests, {stats.bytes_sent / 1e3:.1f} kB, "
+          f"{stats.duplicate_fetches('HEAD')} duplicate HEADs, {missing} missing headers reported")
+
+
+# -------------------
+# Microbenchmarks
+# -------------------
+def large_page(links=5000, scripts=200, rnd=None):
+    """A heavy HTML page: thousands of links, external/inline/module scripts and preload hints."""
+    rnd = rnd or random.Random(1)
+    parts = ["<!doctype html><html><head><title>large</title>"]
+    for i in range(scripts):
+        lib, (stem, snippet) = rnd.choice(sorted(LIBRARIES.items()))
+        kind = i % 4
+        if kind == 0:
+            parts.append(f'<script src="/static/{stem}-{i}.js" defer></script>')
+        elif kind == 1:
+            parts.append(f'<script type="module">{snippet.format(v="1.0.0")}{filler(512, rnd)}</script>')
+        elif kind == 2:
+            parts.append(f'<link rel="modulepreload" href="/static/chunk-{i}.js">')
+        else:
+            parts.append(f"<script>{filler(2048, rnd)}</script>")
+    parts.append("</head><body>")
+    for i in range(links):
+        parts.append(f'<div class="item"><a href="/p/{i}?ref=list">Item {i}</a><p>{filler(96, rnd)}</p></div>')
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def soup_extract(html):
+    """What the crawlers did before html_extract: a full tree, then two find_all walks."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    scripts = [(s.get("src"), s.string) for s in soup.find_all("script")]
+    return scripts, [a["href"] for a in soup.find_all("a", href=True)]
+
+
+def peak_memory(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_micro(args):
+    rnd = random.Random(args.seed)
+    inputs = {
+        "64 KB library": library_script("jQuery", "3.5.1", 64 * 1024, rnd),
+        "1 MB bundle": minified_bundle(1024 * 1024),
+    }
+    for name, module in TOOLS.items():
+        for label, text in inputs.items():
+            mb = len(text) / (1024 * 1024)
+            best, _ = timed(lambda: module.detect_from_content(text), args.repeat)
+            print(f"  {name + '.detect_from_content':<30} {label:<14} {1 / best:>10.0f} calls/s {mb / best:>8.1f} MB/s")
+
+    html = large_page(rnd=rnd)
+    extractors = {f"extract_page[{name}]": (lambda name=name: extract_page(html, "http://bench.invalid/", name))
+                  for name in BACKENDS}
+    try:
+        import bs4  # noqa: F401  (baseline only)
+        extractors["BeautifulSoup + find_all"] = lambda: soup_extract(html)
+    except ImportError:
+        pass
+    mb = len(html) / (1024 * 1024)
+    for label, fn in extractors.items():
+        best, _ = timed(fn, args.repeat)
+        print(f"  {label:<30} {f'{mb:.1f} MB page':<14} {best * 1000:>10.1f} ms     {mb / best:>8.1f} MB/s "
+              f"peak {peak_memory(fn) / 1e6:.1f} MB")
+
+    calls = 2000
+    for i, headers in enumerate(HEADER_PROFILES):
+        best, _ = timed(lambda: [Headers_check.analyze_headers("http://bench.invalid/", headers, verbose=False)
+                                 for _ in range(calls)], args.repeat)
+        print(f"  {'analyze_headers':<30} {f'profile {i}':<14} {calls / best:>10.0f} calls/s")
+
+
+# -------------------
+# Main
+# -------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tool", choices=sorted(TOOLS), default="vulnlibs")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--fanout", type=int, default=4, help="links per page to new pages")
+    parser.add_argument("--shared-scripts", type=int, default=4, help="site-wide library files")
+    parser.add_argument("--unique-ratio", type=float, default=0.5, help="share of pages with a script of their own")
+    parser.add_argument("--inline-ratio", type=float, default=0.3, help="share of pages with an inline library snippet")
+    parser.add_argument("--slow-ratio", type=float, default=0.05, help="share of pages that answer slowly")
+    parser.add_argument("--slow-ms", type=int, default=300)
+    parser.add_argument("--script-kb", type=int, default=64, help="size of the shared library files")
+    parser.add_argument("--spa-ratio", type=float, default=0.1, help="share of pages with an SPA mount point")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--sequential", action="store_true", help="benchmark the sequential crawl")
+    parser.add_argument("--single-nav", action="store_true", help="vulnlibs only: browser fetches page + scripts once")
+    parser.add_argument("--tiered", action="store_true", help="static-first crawl; render only escalated pages")
+    parser.add_argument("--template-samples", type=int, default=2, help="--tiered: pages rendered per template")
+    parser.add_argument("--runs", type=int, default=1, help="crawls sharing one script cache (later runs are warm)")
+    parser.add_argument("--workers", type=int, default=Headers_check.BULK_WORKERS, help="header scan workers")
+    parser.add_argument("--max-rate", type=float, default=1000.0,
+                        help="per-host requests/s; high so pacing doesn't hide crawler cost")
+    parser.add_argument("--repeat", type=int, default=5, help="microbenchmark repetitions (best is reported)")
+    parser.add_argument("--skip", choices=["crawl", "headers", "micro"], action="append", default=[])
+    parser.add_argument("--verbose", action="store_true", help="show the crawlers' own output")
+    args = parser.parse_args()
+
+    configure_rate(initial_rate=args.max_rate, max_rate=args.max_rate)
+    site = build_site(args.pages, args.fanout, args.shared_scripts, args.unique_ratio, args.inline_ratio,
+                      args.slow_ratio, args.slow_ms, args.script_kb, args.seed, args.spa_ratio)
+    print(f"Synthetic site: {len(site.page_paths)} pages, {len(site.script_paths)} scripts, "
+          f"{sum(len(libs) for libs in site.truth.values())} known library uses")
+
+    with serve(site) as server, tempfile.TemporaryDirectory() as tmp:
+        if "crawl" not in args.skip:
+            module = TOOLS[args.tool]
+            mode = "sequential" if args.sequential else "async"
+            with ScriptCache(os.path.join(tmp, "cache.sqlite"), detector=module.DETECTOR) as cache:
+                for run in range(1, args.runs + 1):
+                    print(f"\ncrawl_and_detect ({args.tool}, {mode}) run {run}:")
+                    bench_crawl(module, server, site, args, cache)
+        if "headers" not in args.skip:
+            print("\nheader scan (bulk):")
+            bench_headers(server, site, args)
+    if "micro" not in args.skip:
+        print("\nmicrobenchmarks:")
+        bench_micro(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Microbenchmark: per-pattern re.search loop vs. the compiled LibraryMatcher, and parallel bundle scans.
+
+    python benchmarks/bench_detect.py [--mb 8] [--repeat 5] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import random
+import re
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bundle_scan import configure_bundles, scan_bundle
+from lib_matcher import LibraryMatcher
+import crawl_detect_libs_deeper
+import vulnlibs_detect
+
+BANNERS = [
+    "/*! jQuery v3.5.1 | (c) OpenJS Foundation */",
+    "jQuery.fn.jquery='3.5.1';",
+    "bootstrap.Tooltip.VERSION='4.5.0';",
+    "React.version='17.0.1';",
+    "angular.version.full='1.7.9';",
+    "Vue.version='2.6.14';",
+    "lodash.VERSION='4.17.15';",
+    "//# sourceMappingURL=vendor/lodash-4.17.15.min.js.map",
+]
+
+
+def minified_bundle(size, with_banners=True, seed=1):
+    rnd = random.Random(seed)
+
+    def ident():
+        return "".join(rnd.choice(string.ascii_letters) for _ in range(rnd.randint(1, 8)))
+
+    parts = []
+    total = 0
+    while total < size:
+        chunk = f"var {ident()}=function({ident()}){{return {ident()}.{ident()}({rnd.randint(0, 999)})}};"
+        parts.append(chunk)
+        total += len(chunk)
+    if with_banners:
+        # Spread the banners through the bundle, the last one near the very end
+        for i, banner in enumerate(BANNERS):
+            parts.insert(len(parts) * (i + 1) // (len(BANNERS) + 1), banner)
+    return "".join(parts)
+
+
+def naive_scan(patterns, text):
+    found = []
+    for lib, pats in patterns.items():
+        for pat in pats:
+            m = re.search(pat, text, re.IGNORECASE)
+            if m:
+                found.append((lib, m.group(1) if len(m.groups()) >= 1 else None))
+    return found
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_bundle(text, matcher, workers, repeat):
+    """scan_bundle() throughput per pool size; must find everything a single scan does."""
+    mb = len(text) / (1024 * 1024)
+    expected = {(m.lib, m.version) for m in matcher.scan(text)}
+    base = None
+    for n in workers:
+        configure_bundles(workers=n, source_maps=False)
+        scan_bundle(text, matcher)  # start the pool outside the timing
+        best, found = timed(lambda: scan_bundle(text, matcher), repeat)
+        assert expected <= {(m.lib, m.version) for m in found}, "bundle scan missed a match"
+        base = base or best
+        print(f"{'scan_bundle':<26} {f'{n} workers':<14} {mb / best:>12.1f} {'':>12} {base / best:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=float, default=8.0, help="bundle size in MB")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1],
+                        help="bundle pool sizes to compare")
+    args = parser.parse_args()
+
+    size = int(args.mb * 1024 * 1024)
+    bundles = {
+        "with banners": minified_bundle(size, with_banners=True),
+        "no libraries": minified_bundle(size, with_banners=False),
+    }
+    tables = {
+        "vulnlibs_detect content": vulnlibs_detect.LIBRARY_PATTERNS,
+        "crawl_detect_libs_deeper": crawl_detect_libs_deeper.LIBRARY_PATTERNS,
+    }
+
+    print(f"{'rules':<26} {'bundle':<14} {'before MB/s':>12} {'after MB/s':>12} {'speedup':>8}")
+    for table_name, patterns in tables.items():
+        matcher = LibraryMatcher(patterns)
+        for bundle_name, text in bundles.items():
+            mb = len(text) / (1024 * 1024)
+            before, expected = timed(lambda: naive_scan(patterns, text), args.repeat)
+            after, found = timed(lambda: matcher.scan(text), args.repeat)
+            assert [(m.lib, m.version) for m in found] == expected, "matcher disagrees with re.search loop"
+            print(f"{table_name:<26} {bundle_name:<14} {mb / before:>12.1f} {mb / after:>12.1f} {before / after:>7.1f}x")
+
+    print(f"\n{'bundle scan':<26} {'pool':<14} {'MB/s':>12} {'':>12} {'speedup':>8}")
+    bench_bundle(bundles["with banners"], vulnlibs_detect.CONTENT_MATCHER, sorted(set(args.workers)), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
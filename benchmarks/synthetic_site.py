@@ -0,0 +1,274 @@
+"""Deterministic synthetic site served from 127.0.0.1, with known libraries on every page.
+
+    site = build_site(pages=200, fanout=4)
+    with serve(site) as server:
+        ...crawl server.url...
+    server.stats  # requests, bytes and duplicate fetches, counted by the server
+
+Everything runs locally; nothing touches the network.
+"""
+import hashlib
+import random
+import string
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# Library -> (file stem, snippet). Each snippet is valid JS that the content
+# rules (vulnlibs_detect), the filename/source-map rules
+# (crawl_detect_libs_deeper) and the runtime probes all recognise.
+LIBRARIES = {
+    "jQuery": ("jquery", "/*! jQuery v{v} | (c) OpenJS Foundation */\n"
+                         "window.jQuery={{fn:{{}}}};jQuery.fn.jquery='{v}';"),
+    "Bootstrap": ("bootstrap", "window.bootstrap={{Tooltip:{{}}}};bootstrap.Tooltip.VERSION='{v}';"),
+    "React": ("react", "window.React={{}};React.version='{v}';"),
+    "AngularJS": ("angular", "window.angular={{version:{{}}}};angular.version.full='{v}';"),
+    "Vue": ("vue", "window.Vue={{}};Vue.version='{v}';"),
+    "Lodash": ("lodash", "window._=window.lodash={{cloneDeep:function(){{}}}};lodash.VERSION='{v}';"),
+}
+
+VERSIONS = {
+    "jQuery": ["1.12.4", "3.5.1", "3.6.0", "3.7.1"],
+    "Bootstrap": ["3.4.1", "4.5.0", "5.3.2"],
+    "React": ["16.14.0", "17.0.1", "18.3.0"],
+    "AngularJS": ["1.5.8", "1.7.9", "1.8.3"],
+    "Vue": ["2.6.14", "3.3.4"],
+    "Lodash": ["4.17.15", "4.17.21"],
+}
+
+# Response header sets; each page gets one, so the header scan sees a realistic mix
+HEADER_PROFILES = [
+    {},
+    {"X-Content-Type-Options": "nosniff", "X-Frame-Options": "SAMEORIGIN"},
+    {"Strict-Transport-Security": "max-age=31536000; includeSubDomains", "Content-Security-Policy": "default-src 'self'",
+     "X-Content-Type-Options": "nosniff", "X-Frame-Options": "DENY", "X-XSS-Protection": "1; mode=block"},
+    {"Strict-Transport-Security": "max-age=0", "Access-Control-Allow-Origin": "*", "X-XSS-Protection": "0"},
+]
+
+
+def filler(size, rnd):
+    """Minified-looking JS without anything a library rule could match."""
+    def ident():
+        return "".join(rnd.choice(string.ascii_letters) for _ in range(rnd.randint(1, 8)))
+
+    parts = []
+    total = 0
+    while total < size:
+        chunk = f"var {ident()}=function({ident()}){{return {ident()}.{ident()}({rnd.randint(0, 999)})}};"
+        parts.append(chunk)
+        total += len(chunk)
+    return "".join(parts)
+
+
+def library_script(lib, version, size, rnd):
+    stem, snippet = LIBRARIES[lib]
+    body = snippet.format(v=version) + "\n" + filler(size, rnd)
+    return f"{body}\n//# sourceMappingURL={stem}-{version}.min.js.map\n"
+
+
+class Resource:
+    __slots__ = ("body", "content_type", "headers", "etag", "delay")
+
+    def __init__(self, body, content_type, headers=None, delay=0.0):
+        self.body = body.encode("utf-8")
+        self.content_type = content_type
+        self.headers = headers or {}
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:16] + '"'
+        self.delay = delay
+
+
+class SyntheticSite:
+    """Resources by path plus the ground truth: page path -> {(library, version)}."""
+
+    def __init__(self):
+        self.resources = {}
+        self.truth = {}
+
+    @property
+    def page_paths(self):
+        return list(self.truth)
+
+    @property
+    def script_paths(self):
+        return [path for path, res in self.resources.items() if res.content_type.startswith("application/javascript")]
+
+
+def page_path(i):
+    return "/" if i == 0 else f"/p/{i}"
+
+
+def build_site(pages=200, fanout=4, shared_scripts=4, unique_ratio=0.5, inline_ratio=0.3, slow_ratio=0.05,
+               slow_ms=300, script_kb=64, seed=1, spa_ratio=0.0):
+    """Generate the site.
+
+    Pages form a tree (page i links to its `fanout` children) so all are
+    reachable, plus random cross links and alternate spellings of known URLs
+    (tracking parameters, trailing slashes, fragments) for the dedupe logic.
+    Every page loads a random subset of the `shared_scripts` site-wide library
+    files; `unique_ratio` of the pages also load a script of their own with a
+    library in it and `inline_ratio` carry an inline snippet. `slow_ratio` of
+    the pages answer after `slow_ms`. `spa_ratio` of the pages carry an SPA
+    mount point (drawn from a separate generator, so the rest of the site is
+    the same for any ratio).
+    """
+    rnd = random.Random(seed)
+    spa_rnd = random.Random(seed + 1)
+    site = SyntheticSite()
+    libs = sorted(LIBRARIES)
+
+    shared = []
+    for lib in rnd.sample(libs, min(shared_scripts, len(libs))):
+        version = rnd.choice(VERSIONS[lib])
+        path = f"/static/{LIBRARIES[lib][0]}-{version}.min.js"
+        site.resources[path] = Resource(library_script(lib, version, script_kb * 1024, rnd), "application/javascript")
+        shared.append((path, lib, version))
+
+    for i in range(pages):
+        path = page_path(i)
+        truth = {}  # library -> version; one version per library, as the runtime probes only see one
+        tags = []
+        for src, lib, version in rnd.sample(shared, rnd.randint(1, len(shared))) if shared else []:
+            tags.append(f'<script src="{src}"></script>')
+            truth[lib] = version
+        if rnd.random() < unique_ratio and len(truth) < len(libs):
+            lib = rnd.choice([name for name in libs if name not in truth])
+            version = rnd.choice(VERSIONS[lib])
+            src = f"/static/app-{i}.{LIBRARIES[lib][0]}-{version}.js"
+            site.resources[src] = Resource(library_script(lib, version, script_kb * 1024 // 4, rnd),
+                                           "application/javascript")
+            tags.append(f'<script src="{src}"></script>')
+            truth[lib] = version
+        if rnd.random() < inline_ratio and len(truth) < len(libs):
+            lib = rnd.choice([name for name in libs if name not in truth])
+            version = rnd.choice(VERSIONS[lib])
+            tags.append(f"<script>{LIBRARIES[lib][1].format(v=version)}</script>")
+            truth[lib] = version
+
+        links = [page_path(c) for c in range(i * fanout + 1, min(pages, (i + 1) * fanout + 1))]
+        links += [page_path(rnd.randrange(pages)) for _ in range(max(1, fanout // 2))]
+        variants = []
+        for link in links[:2]:
+            variants.append(rnd.choice([link + "?utm_source=bench", link + "#top",
+                                        link.rstrip("/") + "/" if link != "/" else "/?fbclid=x"]))
+        anchors = "".join(f'<li><a href="{href}">{href}</a></li>' for href in links + variants)
+        mount = '<div id="root"></div>' if spa_rnd.random() < spa_ratio else ""
+        html = (f"<!doctype html><html><head><title>Page {i}</title>{''.join(tags)}</head>"
+                f"<body>{mount}<h1>Page {i}</h1><p>{filler(512, rnd)}</p><ul>{anchors}</ul>"
+                f'<a href="https://elsewhere.invalid/">external</a></body></html>')
+        delay = slow_ms / 1000 if rnd.random() < slow_ratio else 0.0
+        site.resources[path] = Resource(html, "text/html; charset=utf-8", rnd.choice(HEADER_PROFILES), delay)
+        site.truth[path] = set(truth.items())
+    return site
+
+
+# -------------------
+# Server
+# -------------------
+class ServerStats:
+    """What the crawler actually cost, measured on the server side."""
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes_sent = 0
+        self.not_modified = 0
+        self.not_found = 0
+        self.fetches = {}  # (method, path) -> count
+        self._lock = threading.Lock()
+
+    def record(self, method, path, status, size):
+        with self._lock:
+            self.requests += 1
+            self.bytes_sent += size
+            if status == 304:
+                self.not_modified += 1
+            elif status == 404:
+                self.not_found += 1
+            key = (method, path)
+            self.fetches[key] = self.fetches.get(key, 0) + 1
+
+    def duplicate_fetches(self, method="GET"):
+        """Full GETs beyond the first per path (304 revalidations included)."""
+        return sum(n - 1 for (m, _), n in self.fetches.items() if m == method and n > 1)
+
+    def fetched(self, paths, method="GET"):
+        paths = set(paths)
+        return sum(1 for (m, path) in self.fetches if m == method and path in paths)
+
+    def reset(self):
+        with self._lock:
+            self.requests = self.bytes_sent = self.not_modified = self.not_found = 0
+            self.fetches = {}
+
+
+def make_handler(site, stats):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, as a real server would
+
+        def do_GET(self):
+            self.respond(send_body=True)
+
+        def do_HEAD(self):
+            self.respond(send_body=False)
+
+        def respond(self, send_body):
+            path = urlsplit(self.path).path
+            res = site.resources.get(path)
+            if res is None:
+                body = b"not found"
+                self.send_response(404)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(body)
+                stats.record(self.command, path, 404, len(body) if send_body else 0)
+                return
+            if res.delay:
+                time.sleep(res.delay)
+            if self.headers.get("If-None-Match") == res.etag:
+                self.send_response(304)
+                self.send_header("ETag", res.etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                stats.record(self.command, path, 304, 0)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", res.content_type)
+            self.send_header("Content-Length", str(len(res.body)))
+            self.send_header("ETag", res.etag)
+            self.send_header("Last-Modified", formatdate(usegmt=True))
+            for name, value in res.headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            if send_body:
+                self.wfile.write(res.body)
+            stats.record(self.command, path, 200, len(res.body) if send_body else 0)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+@contextmanager
+def serve(site, port=0):
+    """Serve `site` on 127.0.0.1 in a background thread; yields the server with .url and .stats."""
+    stats = ServerStats()
+    server = _Server(("127.0.0.1", port), make_handler(site, stats))
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/"
+    server.stats = stats
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,269 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+from metrics import count, observe
+from ratelimit import default_limiter
+
+# Only these resource types reach the network; images, fonts, media,
+# stylesheets etc. are aborted since detection never looks at them.
+ALLOWED_RESOURCE_TYPES = {"document", "script", "xhr", "fetch"}
+
+# Third-party trackers we never want to load (matched on host suffix)
+BLOCKED_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "facebook.net",
+    "connect.facebook.com",
+    "hotjar.com",
+    "segment.io",
+    "segment.com",
+    "mixpanel.com",
+    "newrelic.com",
+    "nr-data.net",
+    "clarity.ms",
+    "bat.bing.com",
+    "quantserve.com",
+    "scorecardresearch.com",
+)
+
+
+def should_block(request):
+    if request.resource_type not in ALLOWED_RESOURCE_TYPES:
+        return True
+    host = urlparse(request.url).hostname or ""
+    return any(host == h or host.endswith("." + h) for h in BLOCKED_HOSTS)
+
+
+def block_resources_sync(context):
+    """Install the same blocking rules on a sync_playwright BrowserContext."""
+
+    def handle(route):
+        if should_block(route.request):
+            route.abort()
+        else:
+            route.continue_()
+
+    context.route("**/*", handle)
+
+
+def goto_sync(page, url, **kwargs):
+    """page.goto paced by the shared per-host rate limiter (the document request only)."""
+    limiter = default_limiter()
+    limiter.wait(url)
+    start = time.monotonic()
+    try:
+        doc = page.goto(url, **kwargs)
+    except Exception as e:
+        limiter.record(url, error=True)
+        count("navigation_errors", error=type(e).__name__)
+        raise
+    finally:
+        observe("navigate", time.monotonic() - start)
+    limiter.record(url, doc.status if doc else None, time.monotonic() - start,
+                   doc.headers.get("retry-after") if doc else None)
+    return doc
+
+
+async def goto_async(page, url, **kwargs):
+    limiter = default_limiter()
+    await limiter.wait_async(url)
+    start = time.monotonic()
+    try:
+        doc = await page.goto(url, **kwargs)
+    except Exception as e:
+        limiter.record(url, error=True)
+        count("navigation_errors", error=type(e).__name__)
+        raise
+    finally:
+        observe("navigate", time.monotonic() - start)
+    limiter.record(url, doc.status if doc else None, time.monotonic() - start,
+                   doc.headers.get("retry-after") if doc else None)
+    return doc
+
+
+# Every <a href> in the rendered DOM, resolved by the browser (includes client-rendered navigation)
+RENDERED_LINKS_JS = "els => els.map(a => a.href)"
+
+
+def rendered_links_sync(page):
+    return page.eval_on_selector_all("a[href]", RENDERED_LINKS_JS)
+
+
+async def rendered_links_async(page):
+    return await page.eval_on_selector_all("a[href]", RENDERED_LINKS_JS)
+
+
+class LazyContext:
+    """sync_playwright BrowserContext that launches Chromium on the first new_page().
+
+    A static-first crawl may never need the browser; then it is never started.
+    """
+
+    def __init__(self, playwright, headless=True, **context_options):
+        self.playwright = playwright
+        self.headless = headless
+        self.context_options = context_options
+        self._browser = None
+        self._context = None
+
+    def new_page(self):
+        if self._context is None:
+            self._browser = self.playwright.chromium.launch(headless=self.headless)
+            self._context = self._browser.new_context(**self.context_options)
+            block_resources_sync(self._context)
+            count("browser_launches")
+        return self._context.new_page()
+
+    def close(self):
+        if self._browser is not None:
+            self._browser.close()
+
+
+async def _handle_route(route):
+    if should_block(route.request):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+# -------------------
+# Browser pool
+# -------------------
+class BrowserPool:
+    """One Chromium instance with `size` reusable pages, each in its own context.
+
+    With lazy=True Chromium starts when the first page is borrowed, not on entry.
+    """
+
+    def __init__(self, size=4, headless=True, user_agent=None, wait_until="domcontentloaded",
+                 settle_ms=1000, timeout_ms=15000, block_resources=True, lazy=False):
+        self.size = size
+        self.headless = headless
+        self.user_agent = user_agent
+        self.wait_until = wait_until
+        self.settle_ms = settle_ms
+        self.timeout_ms = timeout_ms
+        self.block_resources = block_resources
+        self.lazy = lazy
+        self._playwright = None
+        self._browser = None
+        self._idle = asyncio.Queue()
+        self._starting = asyncio.Lock()
+
+    async def __aenter__(self):
+        if not self.lazy:
+            await self._start()
+        return self
+
+    async def __aexit__(self, *exc):
+        if self._browser is not None:
+            await self._browser.close()
+            await self._playwright.stop()
+
+    async def _start(self):
+        async with self._starting:
+            if self._browser is not None:
+                return
+            from playwright.async_api import async_playwright
+
+            self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=self.headless)
+            count("browser_launches")
+            for _ in range(self.size):
+                self._idle.put_nowait(await self._new_page())
+
+    async def _new_page(self):
+        kwargs = {"user_agent": self.user_agent} if self.user_agent else {}
+        context = await self._browser.new_context(**kwargs)
+        if self.block_resources:
+            await context.route("**/*", _handle_route)
+        return await context.new_page()
+
+    @asynccontextmanager
+    async def page(self):
+        """Borrow an idle page; a page that errored is replaced rather than reused."""
+        if self._browser is None:
+            await self._start()
+        page = await self._idle.get()
+        healthy = False
+        try:
+            yield page
+            healthy = True
+        finally:
+            if healthy and not page.is_closed():
+                self._idle.put_nowait(page)
+            else:
+                try:
+                    await page.context.close()
+                except Exception:
+                    pass
+                self._idle.put_nowait(await self._new_page())
+
+    async def navigate(self, page, url):
+        """Load url with the configured wait strategy, then let late scripts settle."""
+        await goto_async(page, url, timeout=self.timeout_ms, wait_until=self.wait_until)
+        if self.settle_ms:
+            await page.wait_for_timeout(self.settle_ms)
+
+    async def capture(self, page, url):
+        """Navigate once and return (html, [(script_url, body, headers), ...]).
+
+        html is None when the document isn't HTML. Script bodies are the exact
+        bytes the browser received, including scripts injected at runtime.
+        """
+        responses = []
+
+        def on_response(response):
+            if response.request.resource_type == "script":
+                responses.append(response)
+
+        page.on("response", on_response)
+        try:
+            doc = await goto_async(page, url, timeout=self.timeout_ms, wait_until=self.wait_until)
+            if self.settle_ms:
+                await page.wait_for_timeout(self.settle_ms)
+        finally:
+            page.remove_listener("response", on_response)
+        if doc is None or "text/html" not in doc.headers.get("content-type", ""):
+            return None, []
+        html = await doc.text()
+        scripts = []
+        for response in responses:
+            if not response.ok:
+                continue
+            try:
+                scripts.append((response.url, await response.body(), response.headers))
+            except Exception:
+                pass  # body evicted or request aborted
+        return html, scripts
+
+
+def capture_sync(page, url, timeout_ms=60000, wait_until="networkidle"):
+    """sync_playwright counterpart of BrowserPool.capture."""
+    responses = []
+
+    def on_response(response):
+        if response.request.resource_type == "script":
+            responses.append(response)
+
+    page.on("response", on_response)
+    try:
+        doc = goto_sync(page, url, timeout=timeout_ms, wait_until=wait_until)
+    finally:
+        page.remove_listener("response", on_response)
+    if doc is None or "text/html" not in doc.headers.get("content-type", ""):
+        return None, []
+    html = doc.text()
+    scripts = []
+    for response in responses:
+        if not response.ok:
+            continue
+        try:
+            scripts.append((response.url, response.body(), response.headers))
+        except Exception:
+            pass
+    return html, scripts
@@ -0,0 +1,273 @@
+"""Parallel scanning of large webpack/rollup bundles.
+
+A multi-megabyte chunk is cut into segments at module boundaries (license
+banners, webpack module map entries), plus one segment per original source
+when the bundle's source map is served. The segments are scanned on a process
+pool and the per-segment findings merged, so a large bundle scales with the
+available cores and a library bundled twice is reported with both versions.
+
+    scanner = open_scanner(matcher, encoding, url=js_url)
+
+returns a BundleScanner, which streams like a StreamScanner until the decoded
+body reaches BUNDLE_THRESHOLD bytes and then buffers it for a bundle scan;
+both have the same feed()/finish() interface.
+"""
+import base64
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from urllib.parse import unquote_to_bytes, urljoin
+
+import requests
+
+from lib_matcher import SCAN_OVERLAP, StreamScanner
+from metrics import count, timer
+from ratelimit import polite_request
+
+BUNDLE_THRESHOLD = 1024 * 1024
+SEGMENT_SIZE = 256 * 1024
+# How far past SEGMENT_SIZE a cut looks for a module boundary
+BOUNDARY_SEARCH = 16 * 1024
+MAX_SOURCE_MAP_BYTES = 64 * 1024 * 1024
+# Bundle bytes held in memory; anything past this is streamed
+MAX_BUNDLE_BYTES = 32 * 1024 * 1024
+
+# Where one bundled module ends and the next begins
+MODULE_BOUNDARY = re.compile(
+    r"/\*!"  # license banner: /*! jQuery v3.7.1 | (c) OpenJS Foundation */
+    r"|/\*\*\*/"  # webpack development build module separator
+    r"""|[{,]\s*(?:\d+|"[^"\n]{1,200}")\s*:\s*(?:function\s*\(|\([\w$,\s]*\)\s*=>)"""  # module map entry
+)
+SOURCE_MAP_URL = re.compile(r"[#@]\s*sourceMappingURL\s*=\s*(\S+)")
+
+# Pool start method; "forkserver" only exists on Unix
+_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_options = {"workers": os.cpu_count() or 1, "threshold": BUNDLE_THRESHOLD, "source_maps": True}
+_default_pool = None
+_pool_lock = threading.Lock()
+
+
+def configure_bundles(**options):
+    """Override workers / threshold / source_maps, e.g. from command-line flags (None keeps the default)."""
+    global _default_pool
+    _options.update({k: v for k, v in options.items() if v is not None})
+    with _pool_lock:
+        if _default_pool is not None:
+            _default_pool.shutdown()
+            _default_pool = None
+
+
+def add_bundle_arguments(parser):
+    parser.add_argument("--bundle-workers", type=int, metavar="N",
+                        help="processes scanning large JS bundles (default: CPU count; 1 scans in-process)")
+    parser.add_argument("--no-source-maps", dest="source_maps", action="store_false", default=None,
+                        help="don't fetch the source maps of large bundles")
+
+
+def default_pool():
+    """Process pool shared by every bundle scan in this process (None when bundles scan in-process).
+
+    Async crawls reach this from executor threads, hence the lock. Workers come
+    from a fork server: forking the threaded crawler itself can deadlock.
+    """
+    global _default_pool
+    with _pool_lock:
+        if _default_pool is None and _options["workers"] > 1:
+            _default_pool = ProcessPoolExecutor(max_workers=_options["workers"],
+                                                mp_context=multiprocessing.get_context(_START_METHOD))
+        return _default_pool
+
+
+# -------------------
+# Segmenting
+# -------------------
+def split_bundle(text, size=SEGMENT_SIZE):
+    """[(offset, segment)] of about `size` characters each, cut at the first module boundary past `size`.
+
+    Each segment also carries the first SCAN_OVERLAP characters of the next one,
+    so a match is never lost to a cut that fell inside it. As in StreamScanner,
+    a match touching the end of any segment but the last may be cut short and
+    is left to the next segment, which sees it whole.
+    """
+    cuts = [0]
+    pos = size
+    while pos < len(text):
+        m = MODULE_BOUNDARY.search(text, pos, pos + BOUNDARY_SEARCH)
+        cut = m.start() if m else pos  # no boundary close by: plain cut, the overlap covers it
+        cuts.append(cut)
+        pos = cut + size
+    ends = cuts[1:] + [len(text)]
+    return [(start, text[start:end + SCAN_OVERLAP]) for start, end in zip(cuts, ends)]
+
+
+def _load_source_map(ref, url, timeout=5):
+    if ref.startswith("data:"):
+        header, _, data = ref.partition(",")
+        raw = base64.b64decode(data) if header.endswith(";base64") else unquote_to_bytes(data)
+        return json.loads(raw)
+    try:
+        with polite_request("GET", urljoin(url, ref), timeout=timeout, stream=True) as resp:
+            if not resp.ok or int(resp.headers.get("Content-Length") or 0) > MAX_SOURCE_MAP_BYTES:
+                return None
+            # Chunked responses have no Content-Length: the cap is checked while reading
+            body = bytearray()
+            for chunk in resp.iter_content(64 * 1024):
+                body += chunk
+                if len(body) > MAX_SOURCE_MAP_BYTES:
+                    return None
+            return json.loads(body)
+    except (requests.exceptions.RequestException, ValueError):
+        return None
+
+
+def source_map_segments(text, url):
+    """One segment per original source in the bundle's source map, if it is served with sourcesContent."""
+    refs = SOURCE_MAP_URL.findall(text[-4096:])
+    if not refs or not url:
+        return []
+    try:
+        source_map = _load_source_map(refs[-1], url)
+    except ValueError:
+        source_map = None
+    count("source_maps", status="found" if source_map else "missing")
+    if not isinstance(source_map, dict):
+        return []
+    # Index maps nest their sections' maps
+    maps = [s.get("map") or {} for s in source_map.get("sections", [])] or [source_map]
+    segments = []
+    for m in maps:
+        for source, content in zip(m.get("sources") or [], m.get("sourcesContent") or []):
+            if content:
+                # The path goes first so file name rules see e.g. node_modules/jquery-3.7.1/...
+                segments.append(f"/* {source} */\n{content}")
+    return segments
+
+
+# -------------------
+# Scanning
+# -------------------
+def _scan_segment(matcher, offset, text, final):
+    return [m._replace(end=offset + m.end) for m in matcher.scan(text) if final or m.end < len(text)]
+
+
+def merge_matches(results):
+    """Merge per-segment matches: the first match of each (rule, version), in rule order."""
+    found = {}
+    for matches in results:
+        for m in matches:
+            key = (m.rule, m.version)
+            if key not in found or m.end < found[key].end:
+                found[key] = m
+    return sorted(found.values(), key=lambda m: (m.rule, m.end))
+
+
+def scan_bundle(text, matcher, url=None, complete=True):
+    """All matches of `matcher` in a bundle (and its served sources), scanned in parallel segments.
+
+    complete=False means `text` is only the start of the bundle: its last
+    segment then also leaves matches at its end to whoever scans the rest.
+    """
+    with timer("bundle_scan"):
+        segments = split_bundle(text)
+        finals = [False] * (len(segments) - 1) + [complete]
+        if _options["source_maps"]:
+            # Past the end of the bundle, so a bundle match wins the merge; each source is whole
+            sources = source_map_segments(text, url)
+            segments += [(len(text) + i, source) for i, source in enumerate(sources)]
+            finals += [True] * len(sources)
+        count("bundle_segments", len(segments))
+        offsets = [offset for offset, _ in segments]
+        texts = [segment for _, segment in segments]
+        pool = default_pool() if len(segments) > 1 else None
+        if pool is None:
+            results = map(_scan_segment, repeat(matcher), offsets, texts, finals)
+        else:
+            results = pool.map(_scan_segment, repeat(matcher), offsets, texts, finals)
+        return merge_matches(results)
+
+
+class BundleScanner:
+    """StreamScanner interface that switches to scan_bundle() once the body turns out to be large.
+
+    Chunks go through a StreamScanner (which may stop the download early) and
+    are kept until the decoded body reaches the threshold; from then on the
+    body is only buffered and gets a bundle scan on finish(). Past
+    MAX_BUNDLE_BYTES the rest is streamed again, starting SCAN_OVERLAP bytes
+    back so a match across the cut is still seen whole.
+    """
+
+    def __init__(self, matcher, encoding=None, url=None, max_bytes=MAX_BUNDLE_BYTES):
+        self.matcher = matcher
+        self.url = url
+        self.encoding = encoding or "utf-8"
+        self.threshold = _options["threshold"]
+        self.max_bytes = max_bytes
+        self.bytes_scanned = 0
+        self.bundle = False  # set once the body reached the threshold
+        self._stream = StreamScanner(matcher, encoding=encoding)
+        self._sha = hashlib.sha256()
+        self._chunks = []
+        self._buffered = 0
+        self._rest = None  # StreamScanner past max_bytes
+
+    @property
+    def done(self):
+        # Bundles are read to the end, unless the part past max_bytes resolves everything
+        if self._rest is not None:
+            return self._rest.done
+        return not self.bundle and self._stream.done
+
+    @property
+    def sha256(self):
+        """Digest of the bytes read so far: only the body's digest if the stream was read to the end."""
+        return self._sha.hexdigest()
+
+    def feed(self, chunk):
+        self.bytes_scanned += len(chunk)
+        self._sha.update(chunk)
+        if self._rest is not None:
+            return self._rest.feed(chunk)
+        if self.bundle and self._buffered + len(chunk) > self.max_bytes:
+            count("bundle_overflow")
+            self._rest = StreamScanner(self.matcher, encoding=self.encoding)
+            self._rest.feed(b"".join(self._chunks)[-SCAN_OVERLAP:])
+            return self._rest.feed(chunk)
+        self._chunks.append(chunk)
+        self._buffered += len(chunk)
+        if self.bundle:
+            return False
+        if self._buffered >= self.threshold:
+            self.bundle = True
+            self._stream = None
+            return False
+        return self._stream.feed(chunk)
+
+    def finish(self):
+        if not self.bundle:
+            self._chunks = []
+            return self._stream.finish()
+        text = b"".join(self._chunks).decode(self.encoding, errors="replace")
+        self._chunks = []
+        if self._rest is None:
+            return scan_bundle(text, self.matcher, self.url)
+        head = scan_bundle(text, self.matcher, self.url, complete=False)
+        rest = [m._replace(end=len(text) + m.end) for m in self._rest.finish()]
+        return merge_matches([head, rest])
+
+
+def open_scanner(matcher, encoding=None, size=None, url=None):
+    """Scanner for a script body: a StreamScanner when `size` is known to be below the bundle threshold.
+
+    `size` must be the decoded size (e.g. len() of a body in memory), not a
+    Content-Length, which is the compressed size or missing. Otherwise the
+    BundleScanner decides on the bytes it is fed.
+    """
+    if size is not None and size < _options["threshold"]:
+        return StreamScanner(matcher, encoding=encoding)
+    return BundleScanner(matcher, encoding=encoding, url=url)
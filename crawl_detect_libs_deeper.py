@@ -1,198 +1,370 @@
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
-import re
-import csv
-import time
-from collections import deque
-from playwright.sync_api import sync_playwright
-
-# Known libraries regex patterns (extendable)
-LIBRARY_PATTERNS = {
-    "jQuery": [r"jquery[-.](\d+\.\d+\.\d+)"],
-    "Bootstrap": [r"bootstrap[-.](\d+\.\d+\.\d+)"],
-    "React": [r"react[-.](\d+\.\d+\.\d+)"],
-    "AngularJS": [r"angular[-.](\d+\.\d+\.\d+)"],
-    "Vue": [r"vue[-.](\d+\.\d+\.\d+)"],
-    "Moment.js": [r"moment[-.](\d+\.\d+\.\d+)"],
-    "Lodash": [r"lodash[-.](\d+\.\d+\.\d+)"],
-}
+import argparse
+from urllib.parse import urlparse
+import asyncio
+from browser_pool import LazyContext, goto_sync, rendered_links_sync
+from bundle_scan import add_bundle_arguments, configure_bundles
+from escalation import Escalator, add_escalation_arguments
+from frontier import MemoryFrontier, open_frontier
+from html_extract import extract_page
+from inventory import Inventory, summary_line
+from metrics import add_metrics_arguments, count, gauge, start_metrics, timer
+from ratelimit import add_rate_arguments, configure_rate, polite_request
+from report_writers import open_writer
+from rule_pack import default_pack
+from runtime_probes import format_merged, merge_findings, probe_page, probe_page_async
+from script_cache import ScriptCache, detector_key, fetch_and_scan
+from url_canon import canonicalize, internal_links
+
+# Known libraries: filename and content signatures from the shared rule pack (rules/libraries.json),
+# the same content signatures vulnlibs_detect uses
+PACK = default_pack()
+LIBRARY_PATTERNS = PACK.content_patterns()
+
+FILENAME_MATCHER = PACK.matcher("filename")
+MATCHER = PACK.matcher("content")
 
 def detect_from_filename(src_url: str):
-    findings = []
-    for lib, patterns in LIBRARY_PATTERNS.items():
-        for pat in patterns:
-            if re.search(pat, src_url, re.IGNORECASE):
-                findings.append(f"{lib} (maybe {src_url})")
-    return findings
+    return [f"{m.lib} (maybe {src_url})" for m in FILENAME_MATCHER.scan(src_url)]
+
+def describe_matches(matches):
+    # [library, version] pairs (one per distinct pair); labelled when the row is built
+    pairs = []
+    for m in matches:
+        if [m.lib, m.version] not in pairs:
+            pairs.append([m.lib, m.version])
+    return pairs
+
+def content_labels(pairs):
+    return [f"{lib} {ver} (content match)" if ver else f"{lib} (content match)" for lib, ver in pairs]
 
 def detect_from_content(js_code: str):
-    findings = []
-    for lib, patterns in LIBRARY_PATTERNS.items():
-        for pat in patterns:
-            if re.search(pat, js_code, re.IGNORECASE):
-                findings.append(f"{lib} (content match)")
-    return findings
+    return content_labels(describe_matches(MATCHER.scan(js_code)))
 
-def runtime_detection(page):
-    findings = []
-    # jQuery
-    try:
-        jq = page.evaluate("() => window.jQuery && jQuery.fn && jQuery.fn.jquery")
-        if jq:
-            findings.append(f"jQuery {jq} (runtime)")
-    except Exception:
-        pass
-    # Bootstrap
-    try:
-        bs = page.evaluate("() => window.bootstrap && bootstrap.Tooltip && bootstrap.Tooltip.VERSION")
-        if bs:
-            findings.append(f"Bootstrap {bs} (runtime)")
-    except Exception:
-        pass
-    # React
-    try:
-        react = page.evaluate("() => window.React && React.version")
-        if react:
-            findings.append(f"React {react} (runtime)")
-    except Exception:
-        pass
-    # Angular
+def static_findings(abs_src, result):
+    """(library, version, source) triples for one script, for merging with runtime probes."""
+    found = [(m.lib, m.version, "filename") for m in FILENAME_MATCHER.scan(abs_src)]
+    if result:
+        found.extend((lib, ver, "content") for lib, ver in result["detection"])
+    return found
+
+def format_runtime(versions):
+    return [f"{lib} {ver} (runtime)" for lib, ver in versions.items()]
+
+# Cache key for script detections; changes whenever the rule pack does
+DETECTOR = detector_key("deeper-pairs", PACK.fingerprint)
+
+def fetch_script(js_url, cache=None):
+    # Streams the whole file (no truncation) and stops once every library is resolved
+    return fetch_and_scan(js_url, MATCHER, describe_matches, cache)
+
+def script_row(page_url, abs_src, result, found=None):
+    if found is None:
+        found = static_findings(abs_src, result)
+    libs_from_filename = detect_from_filename(abs_src)
+    libs_from_content = content_labels(result["detection"]) if result else []
+    if not (libs_from_filename or libs_from_content):
+        return None
+    return {
+        "page_url": page_url,
+        "script_src": abs_src,
+        "lib_from_filename": ",".join(libs_from_filename),
+        "libs_from_content": ",".join(libs_from_content),
+        "runtime_libs": "",
+        "bytes_scanned": result["bytes_scanned"] if result else 0,
+        "page_libs": "",
+        # [library, version, source] triples for the inventory; the label columns are for display
+        "findings": [list(triple) for triple in found],
+    }
+
+def inline_row(page_url, inline_code, pairs=None):
+    if pairs is None:
+        pairs = describe_matches(MATCHER.scan(inline_code))
+    libs_from_content = content_labels(pairs)
+    if not libs_from_content:
+        return None
+    return {
+        "page_url": page_url,
+        "script_src": "[inline]",
+        "lib_from_filename": "",
+        "libs_from_content": ",".join(libs_from_content),
+        "runtime_libs": "",
+        "bytes_scanned": len(inline_code.encode()),
+        "page_libs": "",
+        "findings": [[lib, ver, "inline"] for lib, ver in pairs],
+    }
+
+def runtime_row(page_url, rt_versions, static=(), script_src="[runtime]"):
+    # page_libs merges the runtime probes with every static finding on the page
+    merged = merge_findings(static, rt_versions)
+    if not merged:
+        return None
+    return {
+        "page_url": page_url,
+        "script_src": script_src,
+        "lib_from_filename": "",
+        "libs_from_content": "",
+        "runtime_libs": ",".join(format_runtime(rt_versions)),
+        "bytes_scanned": 0,
+        "page_libs": ",".join(format_merged(merged)),
+        # page_libs only repeats the page's script rows; the inventory takes the probes alone
+        "findings": [[lib, ver, "runtime"] for lib, ver in rt_versions.items()],
+    }
+
+def new_inventory(keep_pages=False, group_by=None):
+    # One record per (library, version, script URL)
+    return Inventory(keep_pages=keep_pages, group_by=group_by)
+
+def unresolved_scripts(scripts):
+    """Scripts (src or "[inline]") whose static pass left a library without a version, or that couldn't be scanned."""
+    return [src for src, result, found in scripts if result is None or any(ver is None for _, ver, _ in found)]
+
+def visit_page_sync(context, url, cache=None, escalator=None):
+    """Detect libraries on one page; returns (rows, parsed) with parsed None if the page was skipped.
+
+    With an escalator, the browser only visits the page when the static pass leaves something open.
+    """
+    rows = []
     try:
-        ng = page.evaluate("() => window.angular && window.angular.version && window.angular.version.full")
-        if ng:
-            findings.append(f"AngularJS {ng} (runtime)")
-    except Exception:
-        pass
-    # Vue
+        with timer("fetch_page"):
+            resp = polite_request("GET", url, timeout=10)
+            if "text/html" not in resp.headers.get("Content-Type", ""):
+                return rows, None
+            html = resp.text
+        count("bytes", len(resp.content), kind="page")
+        with timer("parse"):
+            # Resolved against the URL that was served (after any redirect)
+            parsed = extract_page(html, resp.url)
+    except Exception as e:
+        print(f"Request failed for {url}: {e}")
+        return rows, None
+
+    # JS detection from <script> (and preloaded scripts)
+    static = []
+    scanned = []  # (src, result, findings) per script
+    for script in parsed.scripts:
+        if script.src:
+            result = fetch_script(script.src, cache)
+            found = static_findings(script.src, result)
+            row = script_row(url, script.src, result, found)
+        else:
+            inline_code = script.code
+            pairs = describe_matches(MATCHER.scan(inline_code))
+            result = {"detection": pairs}
+            found = [(lib, ver, "inline") for lib, ver in pairs]
+            row = inline_row(url, inline_code, pairs)
+        static.extend(found)
+        scanned.append((script.src or "[inline]", result, found))
+        if row:
+            rows.append(row)
+
+    if escalator is not None and not escalator.escalate(url, parsed, unresolved_scripts(scanned)):
+        row = runtime_row(url, {}, static, script_src="[static]")
+        if row:
+            rows.append(row)
+        return rows, parsed
+
+    # Runtime detection, merged with the static findings for this page
     try:
-        vue = page.evaluate("() => window.Vue && Vue.version")
-        if vue:
-            findings.append(f"Vue {vue} (runtime)")
-    except Exception:
-        pass
-    return findings
+        page = context.new_page()
+        goto_sync(page, url, timeout=15000)
+        row = runtime_row(url, probe_page(page), static)
+        if row:
+            rows.append(row)
+        if escalator is not None:
+            parsed.links.extend(rendered_links_sync(page))
+        page.close()
+    except Exception as e:
+        print(f"Runtime detection failed for {url}: {e}")
+    return rows, parsed
+
+def crawl_and_detect(start_url, max_pages=50, cache=None, frontier=None, escalator=None):
+    from playwright.sync_api import sync_playwright
 
-def crawl_and_detect(start_url, max_pages=50):
-    visited = set()
-    queue = deque([start_url])
-    findings = []
-    domain = urlparse(start_url).netloc
+    frontier = frontier if frontier is not None else MemoryFrontier()
+    # Pages are fetched as linked; the canonical form only dedupes the frontier
+    start_key = canonicalize(start_url)
+    frontier.push(start_url, start_key)
+    domain = urlparse(start_key).netloc
 
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context()
+        context = LazyContext(p, headless=True)  # Chromium starts with the first page that needs it
 
-        while queue and len(visited) < max_pages:
-            url = queue.popleft()
-            if url in visited:
-                continue
-            visited.add(url)
-            print(f"[{len(visited)}/{max_pages}] Visiting: {url}")
+        while frontier.visited_count() < max_pages:
+            url = frontier.pop()
+            if url is None:
+                break
+            print(f"[{frontier.visited_count()}/{max_pages}] Visiting: {url}")
 
-            try:
-                resp = requests.get(url, timeout=10)
-                if "text/html" not in resp.headers.get("Content-Type", ""):
-                    continue
-                soup = BeautifulSoup(resp.text, "html.parser")
-            except Exception as e:
-                print(f"Request failed for {url}: {e}")
-                continue
-
-            # JS detection from <script>
-            for script in soup.find_all("script"):
-                src = script.get("src")
-                if src:
-                    abs_src = urljoin(url, src)
-                    libs_from_filename = detect_from_filename(abs_src)
-                    libs_from_content = []
-                    try:
-                        js_resp = requests.get(abs_src, timeout=5)
-                        if js_resp.ok and "javascript" in js_resp.headers.get("Content-Type", ""):
-                            libs_from_content = detect_from_content(js_resp.text[:5000])
-                    except Exception:
-                        pass
-                    if libs_from_filename or libs_from_content:
-                        findings.append({
-                            "page_url": url,
-                            "script_src": abs_src,
-                            "lib_from_filename": ",".join(libs_from_filename),
-                            "libs_from_content": ",".join(libs_from_content),
-                            "runtime_libs": "",
-                        })
-                else:
-                    inline_code = script.string or ""
-                    libs_from_content = detect_from_content(inline_code)
-                    if libs_from_content:
-                        findings.append({
-                            "page_url": url,
-                            "script_src": "[inline]",
-                            "lib_from_filename": "",
-                            "libs_from_content": ",".join(libs_from_content),
-                            "runtime_libs": "",
-                        })
-
-            # Runtime detection
-            try:
-                page = context.new_page()
-                page.goto(url, timeout=15000)
-                rt_libs = runtime_detection(page)
-                if rt_libs:
-                    findings.append({
-                        "page_url": url,
-                        "script_src": "[runtime]",
-                        "lib_from_filename": "",
-                        "libs_from_content": "",
-                        "runtime_libs": ",".join(rt_libs),
-                    })
-                page.close()
-            except Exception as e:
-                print(f"Runtime detection failed for {url}: {e}")
+            count("pages")
+            with timer("page"):
+                rows, parsed = visit_page_sync(context, url, cache, escalator)
 
             # Enqueue new internal links
-            for a in soup.find_all("a", href=True):
-                next_url = urljoin(url, a["href"])
-                if urlparse(next_url).netloc == domain and next_url not in visited:
-                    if next_url.startswith("http"):
-                        queue.append(next_url)
+            if parsed is not None:
+                for next_url, key in internal_links(url, parsed.links, domain):
+                    frontier.push(next_url, key)
+            gauge("frontier_queued", frontier.queued_count())
+            frontier.complete(url, rows)
+
+        context.close()
+
+    if escalator is not None:
+        print(f"🧭 Browser escalation: {escalator.summary()}")
+    return frontier.results()
+
+async def crawl_and_detect_async(start_url, max_pages=50, concurrency=20, per_host=4, cache=None,
+                                 browsers=4, wait_until="domcontentloaded", settle_ms=1000, frontier=None,
+                                 escalator=None):
+    from async_crawl import AsyncCrawler
+    from browser_pool import BrowserPool, rendered_links_async
+
+    # Tiered crawls start Chromium only when the first page is escalated
+    pool = BrowserPool(size=browsers, wait_until=wait_until, settle_ms=settle_ms, lazy=escalator is not None)
+    async with pool:
+        async def process_page(crawler, url, parsed):
+            srcs = []
+            inline_rows = []
+            static = []
+            scanned = []
+            for script in parsed.scripts:
+                if script.src:
+                    srcs.append(script.src)
+                else:
+                    inline_code = script.code
+                    pairs = describe_matches(MATCHER.scan(inline_code))
+                    found = [(lib, ver, "inline") for lib, ver in pairs]
+                    static.extend(found)
+                    scanned.append(("[inline]", {"detection": pairs}, found))
+                    row = inline_row(url, inline_code, pairs)
+                    if row:
+                        inline_rows.append(row)
+
+            scans = await asyncio.gather(*(crawler.fetch_and_scan(src, MATCHER, describe_matches) for src in srcs))
+            rows = []
+            for src, result in zip(srcs, scans):
+                found = static_findings(src, result)
+                static.extend(found)
+                scanned.append((src, result, found))
+                row = script_row(url, src, result, found)
+                if row:
+                    rows.append(row)
+            rows.extend(inline_rows)
 
-            time.sleep(1)
+            if escalator is not None and not escalator.escalate(url, parsed, unresolved_scripts(scanned)):
+                row = runtime_row(url, {}, static, script_src="[static]")
+                if row:
+                    rows.append(row)
+                return rows
 
-        browser.close()
+            try:
+                async with pool.page() as page:
+                    await pool.navigate(page, url)
+                    rt_versions = await probe_page_async(page)
+                    if escalator is not None:
+                        parsed.links.extend(await rendered_links_async(page))
+                row = runtime_row(url, rt_versions, static)
+                if row:
+                    rows.append(row)
+            except Exception as e:
+                print(f"Runtime detection failed for {url}: {e}")
+            return rows
 
+        crawler = AsyncCrawler(concurrency=concurrency, per_host=per_host, cache=cache)
+        findings = await crawler.crawl(start_url, max_pages, process_page, frontier=frontier)
+    if escalator is not None:
+        print(f"🧭 Browser escalation: {escalator.summary()}")
     return findings
 
-def save_csv(findings, filename="findings.csv"):
-    if not findings:
-        print("⚠️ No findings to save.")
-        return
-    keys = findings[0].keys()
-    with open(filename, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=keys)
-        writer.writeheader()
-        writer.writerows(findings)
-    print(f"✅ Results saved to {filename}")
+def run_crawl(start_url, max_pages=50, use_async=True, cache=None, frontier=None, escalator=None):
+    if use_async:
+        try:
+            return asyncio.run(crawl_and_detect_async(start_url, max_pages=max_pages, cache=cache,
+                                                      frontier=frontier, escalator=escalator))
+        except ImportError as e:
+            print(f"⚠️ Async engine unavailable ({e}), falling back to sequential crawl.")
+    return crawl_and_detect(start_url, max_pages=max_pages, cache=cache, frontier=frontier, escalator=escalator)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Crawl a site and detect the JS libraries it loads")
+    parser.add_argument("url", nargs="?", help="starting URL (prompted for when omitted)")
+    parser.add_argument("--max-pages", type=int)
+    parser.add_argument("--sequential", action="store_true", help="use the sequential crawl instead of the async engine")
+    parser.add_argument("--state", help="SQLite file holding the crawl frontier and results (makes the crawl resumable)")
+    parser.add_argument("--resume", action="store_true", help="continue the crawl stored in --state")
+    parser.add_argument("-o", "--output", default="findings.csv",
+                        help="report file; .csv, .jsonl or .xlsx (one row per library, version and script)")
+    parser.add_argument("--per-page", action="store_true",
+                        help="report one row per page, script and library instead of the aggregated inventory")
+    add_rate_arguments(parser)
+    add_bundle_arguments(parser)
+    add_escalation_arguments(parser)
+    add_metrics_arguments(parser)
+    parser.add_argument("--bloom", type=int, metavar="N",
+                        help="dedupe in-memory crawls with a Bloom filter sized for N URLs (bounded memory)")
+    args = parser.parse_args()
+    if args.resume and not args.state:
+        parser.error("--resume needs --state")
+    return args
 
 def main():
-    start_url = input("Enter the starting URL (include https://): ").strip()
-    if not start_url:
-        print("No URL provided. Exiting.")
-        return
-    try:
-        max_pages = int(input("Max pages to crawl (e.g. 50): ").strip() or "50")
-    except ValueError:
-        max_pages = 50
+    args = parse_args()
+    configure_rate(max_rate=args.max_rate, min_rate=args.min_rate)
+    configure_bundles(workers=args.bundle_workers, source_maps=args.source_maps)
+    start_metrics(args)
+    start_url, max_pages, use_async = args.url, args.max_pages, not args.sequential
+    if not start_url and not args.resume:
+        start_url = input("Enter the starting URL (include https://): ").strip()
+        if not start_url:
+            print("No URL provided. Exiting.")
+            return
+        try:
+            max_pages = int(input("Max pages to crawl (e.g. 50): ").strip() or "50")
+        except ValueError:
+            max_pages = 50
+        use_async = input("Use async crawl engine? (Y/n): ").strip().lower() != "n"
 
+    if not args.resume:
+        max_pages = max_pages or 50
+    writer = open_writer(args.output, preview=30)
+    inventory = new_inventory(keep_pages=args.per_page)
+    try:
+        frontier, start_url, max_pages = open_frontier(args.state, start_url, max_pages, args.resume,
+                                                       args.bloom, inventory)
+    except ValueError as e:
+        raise SystemExit(str(e))
     print(f"Starting crawl at {start_url} (max pages={max_pages}). Ensure permission to scan this target.")
-    findings = crawl_and_detect(start_url, max_pages=max_pages)
-    if findings:
+    try:
+        with ScriptCache(detector=DETECTOR) as cache:
+            escalator = Escalator(samples=args.template_samples) if args.tiered else None
+            run_crawl(start_url, max_pages=max_pages, use_async=use_async, cache=cache, frontier=frontier,
+                      escalator=escalator)
+            print(f"Script cache: {cache.hits} hits, {cache.revalidated} revalidated (304), {cache.misses} new")
+            print(f"Frontier: {frontier.visited_count()} pages visited, {frontier.duplicates} duplicate links skipped")
+        if args.state:
+            # Rows live in the state file so they survive a resume; aggregate them in one pass
+            inventory.write_rows(frontier.iter_results())
+    except KeyboardInterrupt:
+        frontier.close()
+        if args.state:
+            writer.close()
+            print(f"\n⏸️ Interrupted; progress saved. Continue with: --state {args.state} --resume")
+        else:
+            inventory.export(writer, per_page=args.per_page)
+            writer.close()
+            print(f"\n⏸️ Interrupted; findings so far written to {args.output}")
+        return
+    frontier.close()
+    inventory.export(writer, per_page=args.per_page)
+    writer.close()
+    print(f"📦 Inventory: {inventory.summary()}")
+    if writer.preview:
         print("\nSummary (first 30 rows):")
-        for row in findings[:30]:
-            print(f"{row['page_url']} | filename_lib:{row['lib_from_filename'] or 'NONE'} "
-                  f"| content_libs:{row['libs_from_content'] or 'NONE'} "
-                  f"| runtime:{row['runtime_libs'] or 'NONE'} "
-                  f"| src:{row['script_src'][:80]}")
-    save_csv(findings)
+        for row in writer.preview:
+            print(summary_line(row))
+    if writer.rows:
+        print(f"✅ {writer.rows} results saved to {args.output}")
+    else:
+        print("⚠️ No findings to save.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,87 @@
+"""Static-first detection: decide which pages still need the browser.
+
+Every page first gets the static pass (its HTML, plus each script fetched and
+scanned over HTTP). A page is rendered in Playwright only when that pass left
+something open:
+
+    unresolved  a script could not be scanned, or a library was found without its version
+    spa         the HTML is a client-rendered app (see html_extract.SPA_MARKERS)
+    few_links   fewer than MIN_LINKS internal links, so navigation may only exist after rendering
+
+Pages sharing a template (site section, path depth and script set) are
+sampled: once SAMPLES_PER_TEMPLATE of them were rendered, the rest of that
+template stays static.
+"""
+import hashlib
+import re
+from urllib.parse import urlsplit
+
+from metrics import count
+from url_canon import internal_links
+
+MIN_LINKS = 2
+SAMPLES_PER_TEMPLATE = 2
+
+# Path segments that identify one record rather than a section: 123, 5f3a9c0e..., uuids, my-post-42
+_ID_SEGMENT = re.compile(r"^(?:\d+|[0-9a-f]*\d[0-9a-f]*|[0-9a-f-]{36}|.*[-_]\d+)$", re.IGNORECASE)
+
+
+def template_key(url, parsed):
+    """Pages with the same key share a layout: same section, path depth and external scripts."""
+    segments = [seg for seg in urlsplit(url).path.split("/") if seg]
+    section = segments[0] if segments and not _ID_SEGMENT.match(segments[0]) else ""
+    srcs = sorted(script.src for script in parsed.scripts if script.src)
+    return hashlib.sha1("\n".join([section, str(len(segments))] + srcs).encode()).hexdigest()
+
+
+class Escalator:
+    """Escalation policy for one crawl; decisions are also counted in the `escalation` metric."""
+
+    def __init__(self, samples=SAMPLES_PER_TEMPLATE, min_links=MIN_LINKS):
+        self.samples = samples
+        self.min_links = min_links
+        self.rendered = {}  # template key -> pages rendered
+        self.decisions = {"static": 0, "sampled": 0, "browser": 0}
+
+    def reasons(self, url, parsed, unresolved):
+        reasons = []
+        if unresolved:
+            reasons.append("unresolved")
+        if parsed.spa:
+            reasons.append("spa")
+        if len(internal_links(url, parsed.links, urlsplit(url).netloc)) < self.min_links:
+            reasons.append("few_links")
+        return reasons
+
+    def escalate(self, url, parsed, unresolved=()):
+        """Reasons to render this page after the static pass ([] when the static pass is enough).
+
+        unresolved lists the scripts (src or "[inline]") the static pass couldn't pin to a version.
+        """
+        reasons = self.reasons(url, parsed, unresolved)
+        if not reasons:
+            decision = "static"
+        else:
+            key = template_key(url, parsed)
+            rendered = self.rendered.get(key, 0)
+            if rendered >= self.samples:
+                decision, reasons = "sampled", []
+            else:
+                self.rendered[key] = rendered + 1
+                decision = "browser"
+        self.decisions[decision] += 1
+        count("escalation", decision=decision)
+        for reason in reasons:
+            count("escalation_reasons", reason=reason)
+        return reasons
+
+    def summary(self):
+        return ", ".join(f"{n} {decision}" for decision, n in self.decisions.items())
+
+
+def add_escalation_arguments(parser):
+    parser.add_argument("--tiered", action="store_true",
+                        help="static detection first; render a page only if it has unresolved scripts, "
+                             "SPA markers or too few links")
+    parser.add_argument("--template-samples", type=int, default=SAMPLES_PER_TEMPLATE, metavar="N",
+                        help=f"--tiered: pages rendered per page template (default {SAMPLES_PER_TEMPLATE})")
@@ -0,0 +1,233 @@
+import hashlib
+import json
+import math
+import sqlite3
+import time
+from collections import deque
+
+QUEUED, IN_PROGRESS, DONE = 0, 1, 2
+
+
+# -------------------
+# Bloom filter
+# -------------------
+class BloomFilter:
+    """Fixed-size set of strings with false positives but no false negatives.
+
+    Sized for `capacity` items at `error_rate`; ~1.2 MB per million URLs at 1%.
+    A false positive means a new URL is taken for an already-seen one and skipped.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # Double hashing: k positions from the two halves of one 128-bit digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def __contains__(self, item):
+        return all(self.array[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def add(self, item):
+        for p in self._positions(item):
+            self.array[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def __len__(self):
+        return self.count
+
+
+# -------------------
+# In-memory frontier
+# -------------------
+class MemoryFrontier:
+    """FIFO queue plus a "seen" set covering queued and visited URLs, so each URL is queued once.
+
+    push(url, key) dedupes on key (e.g. the canonical form) but queues url as
+    given, so pages are fetched as linked. Pass a BloomFilter as `seen` to bound memory on very large crawls, and a
+    report writer (or an inventory.Inventory) as `writer` to stream result rows out instead of keeping them.
+    """
+
+    def __init__(self, seen=None, writer=None):
+        self.queue = deque()
+        self.seen = seen if seen is not None else set()
+        self.writer = writer
+        self.rows = []
+        self.duplicates = 0
+        self._visited = 0
+
+    def push(self, url, key=None):
+        key = key or url
+        if key in self.seen:
+            self.duplicates += 1
+            return False
+        self.seen.add(key)
+        self.queue.append(url)
+        return True
+
+    def pop(self):
+        if not self.queue:
+            return None
+        self._visited += 1
+        return self.queue.popleft()
+
+    def complete(self, url, rows):
+        if self.writer is not None:
+            self.writer.write_rows(rows)
+        else:
+            self.rows.extend(rows)
+
+    def visited_count(self):
+        return self._visited
+
+    def queued_count(self):
+        return len(self.queue)
+
+    def results(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+# -------------------
+# SQLite frontier
+# -------------------
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    state INTEGER NOT NULL DEFAULT 0,
+    link TEXT
+);
+CREATE INDEX IF NOT EXISTS urls_state ON urls (state, seq);
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    row TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class SqliteFrontier:
+    """Queued/visited URLs and result rows on disk, so a crawl survives crashes and Ctrl-C.
+
+    Work is committed every `checkpoint_pages` completed pages or `checkpoint_secs`
+    seconds. Pages that were in progress at the last checkpoint are queued again
+    on resume, and their rows were never committed, so nothing is lost or doubled.
+    The url column holds the dedupe key, link the URL as pushed (see MemoryFrontier).
+    """
+
+    def __init__(self, path, checkpoint_pages=25, checkpoint_secs=30):
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        if "link" not in [row[1] for row in self.db.execute("PRAGMA table_info(urls)")]:
+            self.db.execute("ALTER TABLE urls ADD COLUMN link TEXT")  # state file from an older version
+        self.db.execute("UPDATE urls SET state = ? WHERE state = ?", (QUEUED, IN_PROGRESS))
+        self.db.commit()
+        self.checkpoint_pages = checkpoint_pages
+        self.checkpoint_secs = checkpoint_secs
+        self._since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+        self.duplicates = 0
+        self._popped = {}  # url handed out by pop() -> seq, for complete()
+        self._visited = self.db.execute(
+            "SELECT COUNT(*) FROM urls WHERE state != ?", (QUEUED,)
+        ).fetchone()[0]
+
+    def get_meta(self, key, default=None):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, str(value)))
+        self.db.commit()
+
+    def push(self, url, key=None):
+        # The UNIQUE url column is the seen set: queued and visited URLs are both kept
+        if self.db.execute("INSERT OR IGNORE INTO urls (url, link) VALUES (?, ?)", (key or url, url)).rowcount == 1:
+            return True
+        self.duplicates += 1
+        return False
+
+    def pop(self):
+        row = self.db.execute(
+            "SELECT seq, COALESCE(link, url) FROM urls WHERE state = ? ORDER BY seq LIMIT 1", (QUEUED,)
+        ).fetchone()
+        if row is None:
+            return None
+        self.db.execute("UPDATE urls SET state = ? WHERE seq = ?", (IN_PROGRESS, row[0]))
+        self._visited += 1
+        self._popped[row[1]] = row[0]
+        return row[1]
+
+    def complete(self, url, rows):
+        self.db.executemany("INSERT INTO results (row) VALUES (?)", ((json.dumps(r),) for r in rows))
+        self.db.execute("UPDATE urls SET state = ? WHERE seq = ?", (DONE, self._popped.pop(url)))
+        self._since_checkpoint += 1
+        if (self._since_checkpoint >= self.checkpoint_pages
+                or time.monotonic() - self._last_checkpoint >= self.checkpoint_secs):
+            self.checkpoint()
+
+    def checkpoint(self):
+        self.db.commit()
+        self._since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+
+    def visited_count(self):
+        return self._visited
+
+    def queued_count(self):
+        return self.db.execute("SELECT COUNT(*) FROM urls WHERE state = ?", (QUEUED,)).fetchone()[0]
+
+    def iter_results(self):
+        """Stored rows in completion order, read through a cursor (constant memory)."""
+        for (row,) in self.db.execute("SELECT row FROM results ORDER BY id"):
+            yield json.loads(row)
+
+    def results(self):
+        return list(self.iter_results())
+
+    def close(self):
+        self.checkpoint()
+        self.db.close()
+
+
+def open_frontier(state_path=None, start_url=None, max_pages=None, resume=False, bloom_capacity=None,
+                  writer=None):
+    """Frontier for a command-line run; returns (frontier, start_url, max_pages).
+
+    Without a state file the crawl stays in memory (deduplicated through a Bloom
+    filter when bloom_capacity is given) and rows go straight to `writer`. With
+    one, the start URL and page budget are stored alongside the queue, and
+    --resume reads them back; rows stay in the state file until exported.
+    Raises ValueError when the state file doesn't fit the request.
+    """
+    if not state_path:
+        seen = BloomFilter(bloom_capacity) if bloom_capacity else None
+        return MemoryFrontier(seen, writer), start_url, max_pages
+    frontier = SqliteFrontier(state_path)
+    saved_url = frontier.get_meta("start_url")
+    if resume:
+        if saved_url is None:
+            frontier.close()
+            raise ValueError(f"{state_path}: no crawl to resume")
+        start_url = saved_url
+        max_pages = max_pages or int(frontier.get_meta("max_pages"))
+    elif saved_url is not None and saved_url != start_url:
+        frontier.close()
+        raise ValueError(f"{state_path} holds a crawl of {saved_url}; use --resume or another --state file")
+    frontier.set_meta("start_url", start_url)
+    frontier.set_meta("max_pages", max_pages)
+    return frontier, start_url, max_pages
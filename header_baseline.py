@@ -0,0 +1,117 @@
+import csv
+import hashlib
+import json
+import sqlite3
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_BASELINE_PATH = "headers_baseline.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS headers (
+    url TEXT PRIMARY KEY,
+    origin TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    result TEXT NOT NULL,
+    checked REAL NOT NULL
+);
+"""
+
+
+def origin_of(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+
+def fingerprint(headers, names):
+    """Digest of the checked headers' values; any added, removed or changed value alters it."""
+    blob = "\n".join(f"{name.lower()}:{headers.get(name, '')}" for name in names)
+    return hashlib.sha256(blob.encode("utf-8", "replace")).hexdigest()[:16]
+
+
+def header_status(value):
+    if not value or value == "MISSING":
+        return "MISSING"
+    if value.endswith("(MISCONFIGURED)"):
+        return "MISCONFIGURED"
+    return "OK"
+
+
+# -------------------
+# Baseline store
+# -------------------
+class HeaderBaseline:
+    """Last known header-check result per URL, with its header fingerprint and HTTP validators."""
+
+    def __init__(self, path=DEFAULT_BASELINE_PATH):
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, url):
+        """(fingerprint, result) from the last run, or None for a URL never checked."""
+        row = self.db.execute("SELECT fingerprint, result FROM headers WHERE url = ?", (url,)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def conditional_headers(self, url):
+        row = self.db.execute("SELECT etag, last_modified FROM headers WHERE url = ?", (url,)).fetchone()
+        headers = {}
+        if row and row[0]:
+            headers["If-None-Match"] = row[0]
+        if row and row[1]:
+            headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def put(self, url, headers, names, result):
+        self.db.execute(
+            "INSERT OR REPLACE INTO headers VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, origin_of(url), fingerprint(headers, names), headers.get("ETag"),
+             headers.get("Last-Modified"), json.dumps(result), time.time()),
+        )
+
+
+# -------------------
+# Diff
+# -------------------
+def diff_results(old, new, names):
+    """Rows describing what changed for one URL between two runs (old is None for a new URL)."""
+    if old is None:
+        failing = [name for name in names if header_status(new.get(name)) != "OK"]
+        if not failing:
+            return []
+        return [{"URL": new["URL"], "Header": ", ".join(failing), "Change": "NEW", "Before": "",
+                 "After": f"{len(failing)} missing/misconfigured"}]
+    rows = []
+    for name in names:
+        after = new.get(name, "MISSING")
+        before = old.get(name, "MISSING")
+        if before == after:
+            continue
+        was, now = header_status(before), header_status(after)
+        if now == "OK" and was != "OK":
+            change = "FIXED"
+        elif was == "OK" or (was == "MISCONFIGURED" and now == "MISSING"):
+            change = "REGRESSED"
+        else:
+            change = "CHANGED"
+        rows.append({"URL": new["URL"], "Header": name, "Change": change, "Before": before, "After": after})
+    return rows
+
+
+def save_diff(rows, filename="headers_diff.csv"):
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["URL", "Header", "Change", "Before", "After"])
+        writer.writeheader()
+        writer.writerows(rows)
@@ -0,0 +1,185 @@
+"""Everything the crawlers need from a page, in one pass and without building a BeautifulSoup tree.
+
+    page = extract_page(html, url)
+    page.scripts  # ScriptTag(src, code, type) in document order; src is absolute, code is inline JS
+    page.links    # absolute <a href> targets, in order
+    page.spa      # client-side app markers found in the HTML (mount points, framework state), on first access
+
+Uses selectolax or lxml when installed (both parse in C) and the standard
+library's streaming HTMLParser otherwise.
+"""
+import re
+from collections import namedtuple
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+try:
+    from selectolax.parser import HTMLParser as SelectolaxParser  # optional: pip install selectolax
+except ImportError:
+    SelectolaxParser = None
+
+try:
+    import lxml.html  # optional: pip install lxml
+except ImportError:
+    lxml = None
+
+# src is None for inline scripts, code is None for external ones; type is the
+# script's type attribute ("module", ...) or "preload"/"modulepreload" for <link> hints
+ScriptTag = namedtuple("ScriptTag", "src code type")
+
+# <link rel=...> values that make the browser download a script
+PRELOAD_RELS = {"preload", "modulepreload"}
+
+# Signs that the page is rendered client-side: framework attributes and
+# serialized state, then mount points (both matched in lowercased HTML)
+SPA_MARKERS = ("ng-app", "ng-version", "data-reactroot", "data-v-app", "data-server-rendered",
+               "__next_data__", "__nuxt__", "__initial_state__", "__apollo_state__")
+SPA_MOUNT = re.compile(r"""\bid=["']?(root|app|__next|__nuxt|svelte)["'\s/>]""")
+
+
+def spa_markers(html):
+    lowered = html.lower()
+    found = {m.group(1) for m in SPA_MOUNT.finditer(lowered)}
+    found.update(marker for marker in SPA_MARKERS if marker in lowered)
+    return sorted(found)
+
+
+class Page:
+    """Scripts and links of one document; the SPA markers cost another pass, so only tiered crawls pay for them."""
+
+    __slots__ = ("scripts", "links", "_html", "_spa")
+
+    def __init__(self, scripts, links, html=""):
+        self.scripts = scripts
+        self.links = links
+        self._html = html
+        self._spa = None
+
+    @property
+    def spa(self):
+        if self._spa is None:
+            self._spa = spa_markers(self._html)
+            self._html = None
+        return self._spa
+
+
+class _Collector:
+    """Turns tags from any backend into a Page; external scripts are kept once per URL."""
+
+    def __init__(self, page_url):
+        self.base = page_url
+        self.base_set = False
+        self.scripts = []
+        self.links = []
+        self._srcs = set()
+
+    def absolute(self, ref):
+        return urljoin(self.base, ref.strip())
+
+    def tag(self, name, attrs, text=None):
+        if name == "a":
+            href = (attrs.get("href") or "").strip()
+            if href and not href.startswith("#"):
+                self.links.append(self.absolute(href))
+        elif name == "script":
+            src = (attrs.get("src") or "").strip()
+            if src:
+                self._script(self.absolute(src), attrs.get("type") or "")
+            else:
+                self.scripts.append(ScriptTag(None, text or "", attrs.get("type") or ""))
+        elif name == "link":
+            rels = set((attrs.get("rel") or "").lower().split())
+            href = attrs.get("href")
+            if href and rels & PRELOAD_RELS and ("modulepreload" in rels or (attrs.get("as") or "").lower() == "script"):
+                self._script(self.absolute(href), "modulepreload" if "modulepreload" in rels else "preload")
+        elif name == "base" and not self.base_set and attrs.get("href"):
+            self.base = self.absolute(attrs["href"])
+            self.base_set = True
+
+    def _script(self, src, kind):
+        if src not in self._srcs:
+            self._srcs.add(src)
+            self.scripts.append(ScriptTag(src, None, kind))
+
+    def page(self, html=""):
+        return Page(self.scripts, self.links, html)
+
+
+# -------------------
+# Backends
+# -------------------
+TAGS = ("script", "a", "link", "base")
+
+
+def _extract_selectolax(html, collector):
+    tree = SelectolaxParser(html)
+    for node in tree.css("script, a[href], link[href], base[href]"):
+        collector.tag(node.tag, node.attributes, node.text(deep=True) if node.tag == "script" else None)
+
+
+def _extract_lxml(html, collector):
+    try:
+        root = lxml.html.document_fromstring(html)
+    except Exception:
+        # Empty documents and strings carrying an XML encoding declaration
+        return _extract_stdlib(html, collector)
+    for el in root.iter(*TAGS):
+        collector.tag(el.tag, el.attrib, el.text if el.tag == "script" else None)
+
+
+class _StreamParser(HTMLParser):
+    def __init__(self, collector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+        self._script = None  # attrs of the <script> being read
+        self._code = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in TAGS:
+            return
+        attrs = dict(attrs)
+        if tag == "script":
+            self._script = attrs
+            self._code = []
+        else:
+            self.collector.tag(tag, attrs)
+
+    def handle_data(self, data):
+        if self._script is not None:
+            self._code.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "script" and self._script is not None:
+            self.collector.tag("script", self._script, "".join(self._code))
+            self._script = None
+
+
+def _extract_stdlib(html, collector):
+    parser = _StreamParser(collector)
+    parser.feed(html)
+    if parser._script is not None:
+        # Unterminated <script>: the parser holds the rest of the document back as its code
+        parser.handle_data(parser.rawdata)
+        parser.handle_endtag("script")
+    else:
+        parser.close()
+
+
+BACKENDS = {"html.parser": _extract_stdlib}
+if lxml is not None:
+    BACKENDS["lxml"] = _extract_lxml
+if SelectolaxParser is not None:
+    BACKENDS["selectolax"] = _extract_selectolax
+
+# Fastest available backend
+DEFAULT_BACKEND = next(name for name in ("selectolax", "lxml", "html.parser") if name in BACKENDS)
+
+
+def extract_page(html, page_url, backend=None):
+    """Scripts (external, inline, module, preloaded), links and (lazily) SPA markers of an HTML document.
+
+    URLs are resolved against page_url.
+    """
+    collector = _Collector(page_url)
+    BACKENDS[backend or DEFAULT_BACKEND](html, collector)
+    return collector.page(html)
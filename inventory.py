@@ -0,0 +1,168 @@
+"""Compact library inventory: one record per (library, version, script URL), however many pages load it.
+
+    inv = Inventory(resolve=status_and_vulnerabilities)
+    frontier = MemoryFrontier(writer=inv)   # result rows go in as pages finish
+    inv.export(writer)                      # one row per record
+    inv.export(writer, per_page=True)       # one row per page, script and library (needs keep_pages=True)
+
+Every result row carries its findings as [library, version, source] triples
+(the label columns are for display only). A vendor bundle seen on 2,000
+pages is a single record holding a page count (and, with keep_pages, the
+pages as integer ids), so memory and report size follow the number of
+distinct findings rather than the number of pages. Strings are interned,
+and status/vulnerabilities are resolved once per library and version.
+"""
+import sys
+from array import array
+
+
+def _intern(value):
+    return sys.intern(value) if value else value
+
+
+class Record:
+    __slots__ = ("group", "library", "version", "script", "sources", "page_count", "pages", "first_page",
+                 "last_page", "bytes_scanned", "status", "vulnerabilities")
+
+    def __init__(self, group, library, version, script, keep_pages):
+        self.group = group
+        self.library = library
+        self.version = version
+        self.script = script
+        self.sources = ()
+        self.page_count = 0
+        self.pages = array("I") if keep_pages else None
+        self.first_page = None
+        self.last_page = None  # page id with keep_pages, page URL otherwise
+        self.bytes_scanned = 0
+        self.status = ""
+        self.vulnerabilities = ""
+
+
+class Inventory:
+    """Aggregates result rows; usable wherever a report writer is (write / write_rows).
+
+    resolve(library, version) -> (status, vulnerabilities) is called once per
+    library and version. Rows written while `group` is set are kept apart
+    under it, and group_by names its column in the views (e.g. "target" for
+    batch scans).
+    """
+
+    def __init__(self, resolve=None, keep_pages=False, group_by=None):
+        self.resolve = resolve
+        self.keep_pages = keep_pages
+        self.group_by = group_by
+        self.group = ""
+        self.records = {}  # (group, library, version, script) -> Record
+        self.rows = 0  # rows taken in
+        self._page_ids = {}
+        self._page_urls = []
+        self._resolved = {}
+
+    def _page_id(self, url):
+        pid = self._page_ids.get(url)
+        if pid is None:
+            pid = self._page_ids[url] = len(self._page_urls)
+            self._page_urls.append(url)
+        return pid
+
+    def _record(self, group, library, version, script, first_page, resolved=None):
+        key = (_intern(group), _intern(library), _intern(version), _intern(script))
+        record = self.records.get(key)
+        if record is None:
+            record = self.records[key] = Record(*key, self.keep_pages)
+            record.first_page = first_page
+            record.status, record.vulnerabilities = resolved or self._resolve(record.library, record.version)
+        return record
+
+    def add(self, page_url, script, library, version, source, bytes_scanned=0):
+        record = self._record(self.group, library, version, script, page_url)
+        if source not in record.sources:
+            record.sources += (_intern(source),)
+        record.bytes_scanned = max(record.bytes_scanned, bytes_scanned)
+        # A page's rows arrive together, so comparing with the previous page counts each page once
+        page = self._page_id(page_url) if self.keep_pages else page_url
+        if page != record.last_page:
+            record.page_count += 1
+            record.last_page = page
+            if self.keep_pages:
+                record.pages.append(page)
+
+    def _resolve(self, library, version):
+        if self.resolve is None:
+            return "", ""
+        key = (library, version)
+        if key not in self._resolved:
+            self._resolved[key] = self.resolve(library, version)
+        return self._resolved[key]
+
+    def write(self, row):
+        self.rows += 1
+        for library, version, source in row["findings"]:
+            self.add(row["page_url"], row["script_src"], library, version, source, row["bytes_scanned"])
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def close(self):
+        pass
+
+    def merge(self, other):
+        """Add the records of another Inventory (e.g. one built in a worker process).
+
+        Both must have seen different pages, as batch shards do: page counts are added up.
+        Status and vulnerabilities come from the other Inventory, which already resolved them.
+        """
+        self.rows += other.rows
+        for theirs in other.records.values():
+            record = self._record(theirs.group, theirs.library, theirs.version, theirs.script, theirs.first_page,
+                                  (theirs.status, theirs.vulnerabilities))
+            record.sources += tuple(_intern(s) for s in theirs.sources if s not in record.sources)
+            record.bytes_scanned = max(record.bytes_scanned, theirs.bytes_scanned)
+            record.page_count += theirs.page_count
+            record.last_page = None
+            if self.keep_pages and theirs.pages is not None:
+                record.pages.extend(self._page_id(other._page_urls[pid]) for pid in theirs.pages)
+
+    # -------------------
+    # Views
+    # -------------------
+    def _fields(self, record):
+        row = {self.group_by: record.group} if self.group_by else {}
+        row.update(library=record.library, version=record.version or "")
+        if self.resolve is not None:
+            row.update(status=record.status, vulnerabilities=record.vulnerabilities)
+        row.update(script_src=record.script, detected_by="+".join(record.sources))
+        return row
+
+    def iter_aggregated(self):
+        """One row per record, most widespread first."""
+        for record in sorted(self.records.values(), key=lambda r: (r.group, -r.page_count, r.library)):
+            row = self._fields(record)
+            row.update(pages=record.page_count, example_page=record.first_page, bytes_scanned=record.bytes_scanned)
+            yield row
+
+    def iter_expanded(self):
+        """One row per page, script and library, in crawl order (needs keep_pages=True)."""
+        if not self.keep_pages:
+            raise ValueError("the per-page view needs an Inventory(keep_pages=True)")
+        records = list(self.records.values())
+        refs = sorted((pid, i) for i, record in enumerate(records) for pid in record.pages)
+        for pid, i in refs:
+            yield {"page_url": self._page_urls[pid], **self._fields(records[i])}
+
+    def export(self, writer, per_page=False):
+        writer.write_rows(self.iter_expanded() if per_page else self.iter_aggregated())
+
+    def summary(self):
+        return f"{self.rows} result rows -> {len(self.records)} inventory records"
+
+
+def summary_line(row):
+    """Console line for an aggregated or per-page inventory row."""
+    found = f"{row['library']} {row['version'] or '?'}"
+    if row.get("status"):
+        found += f" ({row['status']})"
+    where = row["page_url"] if "page_url" in row else f"{row['pages']} pages"
+    return f"{found} | {where} | by:{row['detected_by']} | src:{row['script_src'][:80]}"
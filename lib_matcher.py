@@ -0,0 +1,212 @@
+import codecs
+import hashlib
+import json
+import re
+import time
+from collections import namedtuple
+
+from metrics import observe
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+try:
+    import ahocorasick  # optional: pip install pyahocorasick
+except ImportError:
+    ahocorasick = None
+
+LibMatch = namedtuple("LibMatch", "rule lib version end")
+
+# Candidate offsets checked with regex.match before falling back to regex.search
+MAX_ANCHORED_TRIES = 64
+
+# Streaming scan: bytes read per window, and characters carried over between windows.
+# The overlap must be longer than any match, so no match is split across a boundary.
+SCAN_WINDOW = 64 * 1024
+SCAN_OVERLAP = 4096
+
+# Characters that re.IGNORECASE folds onto ASCII letters but str.lower() doesn't
+# (long s, dotted/dotless i). Text containing them skips the prefilter.
+_FOLD_SPECIALS = re.compile("[\u017f\u0130\u0131]")
+
+
+def literal_prefix(pattern):
+    """Leading literal text every match of `pattern` must start with ('' if none)."""
+    chars = []
+    for op, arg in sre_parse.parse(pattern):
+        if op is not sre_parse.LITERAL:
+            break
+        chars.append(chr(arg))
+    return "".join(chars).lower()
+
+
+# -------------------
+# Compiled matcher
+# -------------------
+class LibraryMatcher:
+    """All library patterns behind a literal prefilter.
+
+    A rule's regex only runs from the first offset where its literal prefix occurs,
+    so text that mentions none of the libraries is never handed to the regex engine.
+    Regexes are compiled on first use; `prefixes` ({pattern: prefix}, see
+    rule_pack) skips the prefix analysis.
+    """
+
+    def __init__(self, patterns, flags=re.IGNORECASE, prefixes=None):
+        prefixes = prefixes or {}
+        self.patterns = patterns
+        self.flags = flags
+        self.prefixes = prefixes
+        self.rules = []  # (library, pattern, literal prefix)
+        for lib, pats in patterns.items():
+            for pat in pats:
+                prefix = prefixes.get(pat)
+                self.rules.append((lib, pat, literal_prefix(pat) if prefix is None else prefix))
+        self._regexes = [None] * len(self.rules)
+        self.libs = [lib for lib, pats in patterns.items() if pats]
+        self.literals = sorted({prefix for _, _, prefix in self.rules if prefix})
+        self._automaton = None
+        if ahocorasick is not None and self.literals:
+            self._automaton = ahocorasick.Automaton()
+            for lit in self.literals:
+                self._automaton.add_word(lit, lit)
+            self._automaton.make_automaton()
+
+    def __reduce__(self):
+        # Pickled as its rule table: a worker process builds the matcher once and reuses it
+        return (shared_matcher, (self.patterns, self.flags, self.prefixes))
+
+    def _first_offsets(self, lowered):
+        """Map each literal prefix to its first offset in lowered text (missing literals are absent)."""
+        offsets = {}
+        if self._automaton is not None:
+            for end, lit in self._automaton.iter(lowered):
+                if lit not in offsets:
+                    offsets[lit] = end - len(lit) + 1
+                    if len(offsets) == len(self.literals):
+                        break
+            return offsets
+        for lit in self.literals:
+            pos = lowered.find(lit)
+            if pos >= 0:
+                offsets[lit] = pos
+        return offsets
+
+    def _regex(self, idx):
+        regex = self._regexes[idx]
+        if regex is None:
+            regex = self._regexes[idx] = re.compile(self.rules[idx][1], self.flags)
+        return regex
+
+    @staticmethod
+    def _verify(regex, text, lowered, prefix, pos):
+        # Anchored matches at each candidate offset; if the literal turns out to be
+        # very common, let the regex engine scan the rest in one go.
+        for _ in range(MAX_ANCHORED_TRIES):
+            m = regex.match(text, pos)
+            if m:
+                return m
+            pos = lowered.find(prefix, pos + 1)
+            if pos < 0:
+                return None
+        return regex.search(text, pos)
+
+    def scan(self, text, rules=None):
+        """Return a LibMatch for every rule (optionally only those in `rules`) that matches text."""
+        start = time.perf_counter()
+        lowered = None if _FOLD_SPECIALS.search(text) else text.lower()
+        offsets = self._first_offsets(lowered) if lowered is not None else None
+        found = []
+        for idx, (lib, _, prefix) in enumerate(self.rules):
+            if rules is not None and idx not in rules:
+                continue
+            if offsets is None or not prefix:
+                m = self._regex(idx).search(text)
+            elif prefix in offsets:
+                m = self._verify(self._regex(idx), text, lowered, prefix, offsets[prefix])
+            else:
+                continue
+            if m:
+                found.append(LibMatch(idx, lib, m.group(1) if m.re.groups >= 1 else None, m.end()))
+        observe("detect", time.perf_counter() - start)
+        return found
+
+
+_shared_matchers = {}
+
+
+def shared_matcher(patterns, flags=re.IGNORECASE, prefixes=None):
+    """LibraryMatcher for this rule table, built once per process."""
+    key = (json.dumps(patterns, sort_keys=True), flags)
+    matcher = _shared_matchers.get(key)
+    if matcher is None:
+        matcher = _shared_matchers[key] = LibraryMatcher(patterns, flags, prefixes)
+    return matcher
+
+
+# -------------------
+# Streaming scan
+# -------------------
+class StreamScanner:
+    """Scan a byte stream window by window with bounded memory.
+
+    feed() returns True once every library has been resolved (matched with a
+    version, or all of its rules matched), so the caller can stop reading.
+    """
+
+    def __init__(self, matcher, encoding=None, window=SCAN_WINDOW, overlap=SCAN_OVERLAP):
+        self.matcher = matcher
+        self.window = window
+        self.overlap = overlap
+        self.pending = set(range(len(matcher.rules)))
+        self.unresolved = set(matcher.libs)
+        self.found = []
+        self.bytes_scanned = 0
+        self._sha = hashlib.sha256()
+        self._decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+        self._buf = ""
+        self._fresh = 0  # characters at the end of _buf not scanned yet
+
+    @property
+    def done(self):
+        return not self.unresolved
+
+    @property
+    def sha256(self):
+        """Digest of the bytes read so far: only the body's digest if the stream was read to the end."""
+        return self._sha.hexdigest()
+
+    def feed(self, chunk):
+        self.bytes_scanned += len(chunk)
+        self._sha.update(chunk)
+        text = self._decoder.decode(chunk)
+        self._buf += text
+        self._fresh += len(text)
+        if self._fresh >= self.window:
+            self._scan(final=False)
+        return self.done
+
+    def finish(self):
+        """Scan whatever is buffered and return the matches in rule order."""
+        self._buf += self._decoder.decode(b"", final=True)
+        self._scan(final=True)
+        return sorted(self.found)
+
+    def _scan(self, final):
+        buf = self._buf
+        for m in self.matcher.scan(buf, self.pending):
+            # A match touching the end of the buffer may continue in the next
+            # chunk (e.g. a version cut off mid-number); it lies inside the
+            # overlap and gets re-scanned with the following window.
+            if not final and m.end >= len(buf):
+                continue
+            self.pending.discard(m.rule)
+            self.found.append(m)
+            if m.version is not None or not any(
+                lib == m.lib for lib, _, _ in (self.matcher.rules[r] for r in self.pending)
+            ):
+                self.unresolved.discard(m.lib)
+        self._buf = buf[-self.overlap:]
+        self._fresh = 0
@@ -0,0 +1,319 @@
+"""Per-stage timings, counters and gauges for a scan, kept in-process.
+
+    with timer("parse"):
+        parsed = extract_page(html, url)
+    count("http_requests", status="200")
+
+--metrics writes a JSON summary when the run ends, --metrics-port serves the
+same numbers in Prometheus text format while it runs, and --profile /
+--sample profile the whole run (cProfile, or a stack sampler over all threads).
+"""
+import atexit
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds (seconds) of the duration histogram buckets
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PREFIX = "scan_"
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last one is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (capped at the largest value seen)."""
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Metrics:
+    """Thread-safe registry; the same instance serves sync, threaded and asyncio code."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.counters = {}  # (name, labels) -> number
+        self.gauges = {}
+        self.stages = {}  # stage -> Histogram
+        self._lock = threading.Lock()
+
+    def count(self, name, n=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def gauge(self, name, value, **labels):
+        with self._lock:
+            self.gauges[_key(name, labels)] = value
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            hist = self.stages.get(stage)
+            if hist is None:
+                hist = self.stages[stage] = Histogram()
+            hist.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def reset(self):
+        with self._lock:
+            self.counters, self.gauges, self.stages = {}, {}, {}
+
+    def export_state(self):
+        """Raw counters, gauges and histograms; picklable, so a worker process can hand them to merge()."""
+        with self._lock:
+            stages = {stage: (list(h.counts), h.count, h.total, h.max) for stage, h in self.stages.items()}
+            return {"counters": dict(self.counters), "gauges": dict(self.gauges), "stages": stages}
+
+    def merge(self, state):
+        """Add another registry's export_state() to this one (gauges keep the latest value)."""
+        with self._lock:
+            for key, value in state["counters"].items():
+                self.counters[key] = self.counters.get(key, 0) + value
+            self.gauges.update(state["gauges"])
+            for stage, (counts, n, total, top) in state["stages"].items():
+                hist = self.stages.get(stage)
+                if hist is None:
+                    hist = self.stages[stage] = Histogram()
+                hist.counts = [a + b for a, b in zip(hist.counts, counts)]
+                hist.count += n
+                hist.total += total
+                hist.max = max(hist.max, top)
+
+    def summary(self):
+        """JSON-ready snapshot: counters, gauges and per-stage count/total/mean/p50/p95/max seconds."""
+        with self._lock:
+            stages = {
+                stage: {
+                    "count": h.count,
+                    "total_seconds": round(h.total, 6),
+                    "mean_seconds": round(h.total / h.count, 6) if h.count else 0.0,
+                    "p50_seconds": h.quantile(0.5),
+                    "p95_seconds": h.quantile(0.95),
+                    "max_seconds": round(h.max, 6),
+                }
+                for stage, h in sorted(self.stages.items())
+            }
+            return {
+                "elapsed_seconds": round(time.time() - self.started, 3),
+                "counters": {name + _label_text(labels): v for (name, labels), v in sorted(self.counters.items())},
+                "gauges": {name + _label_text(labels): v for (name, labels), v in sorted(self.gauges.items())},
+                "stages": stages,
+            }
+
+    def prometheus(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {PREFIX}{name}_total counter")
+                    typed.add(name)
+                lines.append(f"{PREFIX}{name}_total{_label_text(labels)} {value}")
+            for (name, labels), value in sorted(self.gauges.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {PREFIX}{name} gauge")
+                    typed.add(name)
+                lines.append(f"{PREFIX}{name}{_label_text(labels)} {value}")
+            if self.stages:
+                lines.append(f"# TYPE {PREFIX}stage_seconds histogram")
+            for stage, h in sorted(self.stages.items()):
+                stage_label = [("stage", stage)]
+                cumulative = 0
+                for bound, n in zip(BUCKETS + ("+Inf",), h.counts):
+                    cumulative += n
+                    lines.append(f"{PREFIX}stage_seconds_bucket{_label_text(stage_label, [('le', bound)])} {cumulative}")
+                lines.append(f"{PREFIX}stage_seconds_sum{_label_text(stage_label)} {h.total:.6f}")
+                lines.append(f"{PREFIX}stage_seconds_count{_label_text(stage_label)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def save_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def print_stages(self):
+        summary = self.summary()
+        print(f"\n{'stage':<16} {'count':>8} {'total s':>10} {'mean ms':>10} {'p95 ms':>10} {'max ms':>10}")
+        for stage, s in summary["stages"].items():
+            print(f"{stage:<16} {s['count']:>8} {s['total_seconds']:>10.2f} {s['mean_seconds'] * 1000:>10.1f} "
+                  f"{s['p95_seconds'] * 1000:>10.1f} {s['max_seconds'] * 1000:>10.1f}")
+        for name, value in summary["counters"].items():
+            print(f"{name}: {value}")
+
+
+_default_metrics = Metrics()
+
+
+def default_metrics():
+    """Registry shared by every stage in this process."""
+    return _default_metrics
+
+
+def timer(stage):
+    return _default_metrics.timer(stage)
+
+
+def observe(stage, seconds):
+    _default_metrics.observe(stage, seconds)
+
+
+def count(name, n=1, **labels):
+    _default_metrics.count(name, n, **labels)
+
+
+def gauge(name, value, **labels):
+    _default_metrics.gauge(name, value, **labels)
+
+
+# -------------------
+# Export
+# -------------------
+def serve_metrics(port, metrics=None, host="127.0.0.1"):
+    """Serve GET /metrics in Prometheus text format from a daemon thread; returns the server."""
+    metrics = metrics or _default_metrics
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# -------------------
+# Profiling
+# -------------------
+class StackSampler:
+    """Samples every thread's Python stack at a fixed interval (threads, asyncio and all).
+
+    Writes collapsed stacks ("frame;frame;frame count" per line), the input of
+    flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                    frame = frame.f_back
+                key = ";".join(reversed(stack))
+                self.samples[key] = self.samples.get(key, 0) + 1
+
+    def stop(self, path):
+        self._stop.set()
+        self._thread.join()
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, n in sorted(self.samples.items(), key=lambda item: -item[1]):
+                f.write(f"{stack} {n}\n")
+
+
+def add_metrics_arguments(parser):
+    parser.add_argument("--metrics", metavar="PATH", help="write a JSON summary of stage timings and counters here")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics during the run")
+    parser.add_argument("--profile", metavar="PATH", help="run under cProfile (main thread) and save the stats here")
+    parser.add_argument("--sample", metavar="PATH",
+                        help="sample all threads' stacks every 5 ms; collapsed stacks for flamegraph.pl/speedscope")
+
+
+def start_metrics(args):
+    """Start what the command-line flags ask for; results are written when the process exits."""
+    server = serve_metrics(args.metrics_port) if args.metrics_port else None
+    if server:
+        print(f"📈 Prometheus metrics at http://127.0.0.1:{args.metrics_port}/metrics")
+    profiler = None
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    sampler = None
+    if args.sample:
+        sampler = StackSampler()
+        sampler.start()
+
+    def finish():
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"\n📈 cProfile stats saved to {args.profile}; top functions by cumulative time:")
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+        if sampler:
+            sampler.stop(args.sample)
+            print(f"📈 {sum(sampler.samples.values())} stack samples saved to {args.sample}")
+        if args.metrics or args.metrics_port:
+            _default_metrics.print_stages()
+        if args.metrics:
+            _default_metrics.save_json(args.metrics)
+            print(f"📈 Metrics summary saved to {args.metrics}")
+        if server:
+            server.shutdown()
+
+    atexit.register(finish)
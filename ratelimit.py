@@ -0,0 +1,171 @@
+import asyncio
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+from metrics import count, observe
+
+# Responses that mean "slow down"; the request is retried after backing off
+RETRY_STATUSES = {429, 503}
+MAX_RETRIES = 2
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date); None if absent/invalid."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+# -------------------
+# Per-host token buckets
+# -------------------
+class HostBucket:
+    __slots__ = ("rate", "tokens", "updated", "blocked_until", "latency")
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.latency = None  # moving average of response time, seconds
+
+
+class RateLimiter:
+    """Token bucket per host whose rate follows AIMD.
+
+    Each healthy response adds `increase / rate` requests/s (about +`increase`
+    per second of traffic), up to max_rate. A 429/503, a timeout or a
+    connection error multiplies the rate by `decrease`, down to min_rate, and
+    Retry-After pauses the host entirely. Responses slower than slow_latency
+    (moving average) stop the ramp-up and ease the rate down.
+    Thread-safe; the same instance serves sync and asyncio code.
+    """
+
+    def __init__(self, initial_rate=2.0, min_rate=0.2, max_rate=20.0, burst=2, increase=0.5,
+                 decrease=0.5, slow_latency=2.0, max_retry_after=120.0):
+        self.initial_rate = min(max(initial_rate, min_rate), max_rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_latency = slow_latency
+        self.max_retry_after = max_retry_after
+        self.throttled = 0
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host):
+        bucket = self._hosts.get(host)
+        if bucket is None:
+            bucket = self._hosts[host] = HostBucket(self.initial_rate, self.burst)
+        return bucket
+
+    def reserve(self, url):
+        """Take a token for url's host and return how long to sleep before sending the request."""
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            bucket = self._bucket(host)
+            now = time.monotonic()
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * bucket.rate)
+            bucket.updated = now
+            bucket.tokens -= 1
+            delay = 0.0 if bucket.tokens >= 0 else -bucket.tokens / bucket.rate
+            return max(delay, bucket.blocked_until - now)
+
+    def wait(self, url):
+        delay = self.reserve(url)
+        if delay > 0:
+            observe("rate_wait", delay)
+            time.sleep(delay)
+
+    async def wait_async(self, url):
+        delay = self.reserve(url)
+        if delay > 0:
+            observe("rate_wait", delay)
+            await asyncio.sleep(delay)
+
+    def record(self, url, status=None, latency=None, retry_after=None, error=False):
+        """Feed back one response (or error=True for a timeout / connection failure)."""
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            bucket = self._bucket(host)
+            if latency is not None:
+                bucket.latency = latency if bucket.latency is None else 0.8 * bucket.latency + 0.2 * latency
+            if error or status in RETRY_STATUSES:
+                self.throttled += 1
+                bucket.rate = max(self.min_rate, bucket.rate * self.decrease)
+                bucket.tokens = min(bucket.tokens, 0)
+                pause = parse_retry_after(retry_after)
+                if pause:
+                    bucket.blocked_until = max(bucket.blocked_until,
+                                               time.monotonic() + min(pause, self.max_retry_after))
+            elif bucket.latency is not None and bucket.latency > self.slow_latency:
+                bucket.rate = max(self.min_rate, bucket.rate * 0.9)
+            else:
+                bucket.rate = min(self.max_rate, bucket.rate + self.increase / bucket.rate)
+
+    def rates(self):
+        """Current requests/s per host."""
+        with self._lock:
+            return {host: round(b.rate, 2) for host, b in self._hosts.items()}
+
+
+_default_limiter = None
+
+
+def default_limiter():
+    """Limiter shared by every fetch in this process (pages, scripts, header checks)."""
+    global _default_limiter
+    if _default_limiter is None:
+        _default_limiter = RateLimiter()
+    return _default_limiter
+
+
+def configure_rate(**options):
+    """Replace the shared limiter, e.g. configure_rate(max_rate=5) from command-line ceilings."""
+    global _default_limiter
+    _default_limiter = RateLimiter(**{k: v for k, v in options.items() if v is not None})
+    return _default_limiter
+
+
+def add_rate_arguments(parser):
+    parser.add_argument("--max-rate", type=float, help="per-host ceiling in requests/s (default 20)")
+    parser.add_argument("--min-rate", type=float, help="per-host floor in requests/s when backing off (default 0.2)")
+
+
+# -------------------
+# Sync requests
+# -------------------
+def polite_request(method, url, http=requests, limiter=None, **kwargs):
+    """requests call paced by the host's bucket; 429/503 are retried after backing off.
+
+    Returns the last response; connection errors are recorded and re-raised.
+    """
+    limiter = limiter or default_limiter()
+    for attempt in range(MAX_RETRIES + 1):
+        limiter.wait(url)
+        start = time.monotonic()
+        try:
+            resp = http.request(method, url, **kwargs)
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            limiter.record(url, error=True)
+            count("http_errors", error=type(e).__name__)
+            raise
+        latency = time.monotonic() - start
+        limiter.record(url, resp.status_code, latency, resp.headers.get("Retry-After"))
+        observe("http", latency)
+        count("http_requests", method=method, status=resp.status_code)
+        if resp.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            return resp
+        resp.close()
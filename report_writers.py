@@ -0,0 +1,135 @@
+"""Row-at-a-time report output, so memory stays flat however many rows a scan produces.
+
+    with open_writer("findings.jsonl") as writer:
+        writer.write({"page_url": ..., ...})
+
+The format follows the file extension: .csv, .jsonl or .xlsx. Files are
+created on the first row, so a scan without results leaves nothing behind.
+"""
+import csv
+import json
+import os
+
+
+class ReportWriter:
+    """Base class: subclasses implement _open(first_row), _write(row) and _close()."""
+
+    def __init__(self, path, fieldnames=None, preview=0):
+        self.path = path
+        self.fieldnames = list(fieldnames) if fieldnames else None
+        self.rows = 0
+        self.preview = []  # first `preview` rows, kept for a console summary
+        self._preview_size = preview
+        self._opened = False
+
+    def write(self, row):
+        if not self._opened:
+            if self.fieldnames is None:
+                self.fieldnames = list(row.keys())
+            self._open()
+            self._opened = True
+        self._write(row)
+        self.rows += 1
+        if len(self.preview) < self._preview_size:
+            self.preview.append(row)
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def close(self):
+        if self._opened:
+            self._close()
+            self._opened = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvWriter(ReportWriter):
+    """CSV flushed after every row, so a crash keeps everything written so far."""
+
+    def _open(self):
+        self._file = open(self.path, "w", newline="", encoding="utf-8")
+        self._csv = csv.DictWriter(self._file, fieldnames=self.fieldnames)
+        self._csv.writeheader()
+
+    def _write(self, row):
+        self._csv.writerow(row)
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class JsonlWriter(ReportWriter):
+    """One JSON object per line, flushed after every row."""
+
+    def _open(self):
+        self._file = open(self.path, "w", encoding="utf-8")
+
+    def _write(self, row):
+        self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class XlsxWriter(ReportWriter):
+    """openpyxl write-only workbook; styler(column, value) returns a Font (or None) per cell.
+
+    Rows are streamed to a temporary file by openpyxl and the .xlsx is
+    assembled on close, so styles are applied as rows arrive, not in a second pass.
+    """
+
+    def __init__(self, path, fieldnames=None, preview=0, styler=None, title="Results"):
+        super().__init__(path, fieldnames, preview)
+        self.styler = styler
+        self.title = title
+
+    def _open(self):
+        from openpyxl import Workbook  # pip install openpyxl
+
+        self._wb = Workbook(write_only=True)
+        self._ws = self._wb.create_sheet(self.title)
+        self._ws.append(self.fieldnames)
+
+    def _write(self, row):
+        if self.styler is None:
+            self._ws.append([row.get(col, "") for col in self.fieldnames])
+            return
+        from openpyxl.cell import WriteOnlyCell
+
+        cells = []
+        for col in self.fieldnames:
+            cell = WriteOnlyCell(self._ws, value=row.get(col, ""))
+            font = self.styler(col, cell.value)
+            if font is not None:
+                cell.font = font
+            cells.append(cell)
+        self._ws.append(cells)
+
+    def _close(self):
+        self._wb.save(self.path)
+
+
+WRITERS = {
+    ".csv": CsvWriter,
+    ".jsonl": JsonlWriter,
+    ".xlsx": XlsxWriter,
+}
+
+
+def open_writer(path, fieldnames=None, preview=0, **options):
+    """Writer for `path` chosen by extension; extra options go to the writer (e.g. styler for .xlsx)."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in WRITERS:
+        raise ValueError(f"{path}: unsupported report format (use {', '.join(sorted(WRITERS))})")
+    cls = WRITERS[ext]
+    if cls is not XlsxWriter:
+        options = {}  # styles only exist in spreadsheets
+    return cls(path, fieldnames, preview, **options)
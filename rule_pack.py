@@ -0,0 +1,113 @@
+"""Library signatures shared by every detector, loaded from one rule pack (rules/libraries.json).
+
+Each library in the pack may have:
+    filename  regexes matched against script URLs (group 1 = version)
+    content   regexes matched against script bodies
+    runtime   JS expression that yields the loaded version in the page
+    latest    newest released version
+
+The pack is compiled once into rules/libraries.compiled.json (patterns
+validated, literal prefilter of every pattern worked out) and that artifact is
+reused until the pack changes. Regexes themselves are compiled lazily, the
+first time their literal prefix shows up in scanned text.
+"""
+import hashlib
+import json
+import os
+import re
+
+from lib_matcher import LibraryMatcher, literal_prefix
+
+RULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules")
+DEFAULT_PACK_PATH = os.path.join(RULES_DIR, "libraries.json")
+
+# Bump when the compiled artifact's layout or the prefix analysis changes
+COMPILED_FORMAT = 1
+PATTERN_KINDS = ("filename", "content")
+
+
+class RulePack:
+    def __init__(self, libraries, fingerprint, prefixes):
+        self.libraries = libraries
+        self.fingerprint = fingerprint
+        self.prefixes = prefixes
+        self._matchers = {}
+
+    def patterns(self, kind):
+        """{library: [regex, ...]} for one signature kind."""
+        return {lib: list(entry[kind]) for lib, entry in self.libraries.items() if entry.get(kind)}
+
+    def content_patterns(self):
+        # A versioned file name inside a body (banner, sourceMappingURL) is content evidence too
+        return {
+            lib: entry.get("content", []) + entry.get("filename", [])
+            for lib, entry in self.libraries.items()
+            if entry.get("content") or entry.get("filename")
+        }
+
+    @property
+    def runtime(self):
+        return {lib: entry["runtime"] for lib, entry in self.libraries.items() if entry.get("runtime")}
+
+    @property
+    def latest(self):
+        return {lib: entry["latest"] for lib, entry in self.libraries.items() if entry.get("latest")}
+
+    def matcher(self, kind):
+        """Shared LibraryMatcher for "filename" or "content" signatures, using the precomputed prefixes."""
+        matcher = self._matchers.get(kind)
+        if matcher is None:
+            patterns = self.content_patterns() if kind == "content" else self.patterns(kind)
+            matcher = self._matchers[kind] = LibraryMatcher(patterns, prefixes=self.prefixes)
+        return matcher
+
+
+def compile_pack(libraries, path):
+    """Validate every pattern and work out its literal prefix; errors name the library."""
+    prefixes = {}
+    for lib, entry in libraries.items():
+        for kind in PATTERN_KINDS:
+            for pattern in entry.get(kind, []):
+                try:
+                    re.compile(pattern)
+                except re.error as e:
+                    raise ValueError(f"{path}: {lib} {kind} pattern {pattern!r}: {e}") from None
+                prefixes[pattern] = literal_prefix(pattern)
+    return prefixes
+
+
+def load_pack(path=DEFAULT_PACK_PATH, compiled_path=None):
+    """RulePack from `path`, via its compiled artifact when that is up to date."""
+    compiled_path = compiled_path or os.path.splitext(path)[0] + ".compiled.json"
+    with open(path, "rb") as f:
+        raw = f.read()
+    fingerprint = hashlib.sha256(raw + str(COMPILED_FORMAT).encode()).hexdigest()[:16]
+    try:
+        with open(compiled_path, encoding="utf-8") as f:
+            compiled = json.load(f)
+        if compiled.get("fingerprint") == fingerprint:
+            return RulePack(compiled["libraries"], fingerprint, compiled["prefixes"])
+    except (OSError, ValueError, KeyError):
+        pass
+
+    libraries = json.loads(raw)["libraries"]
+    prefixes = compile_pack(libraries, path)
+    try:
+        tmp = compiled_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "libraries": libraries, "prefixes": prefixes}, f)
+        os.replace(tmp, compiled_path)
+    except OSError:
+        pass  # read-only install: compile again next run
+    return RulePack(libraries, fingerprint, prefixes)
+
+
+_default_pack = None
+
+
+def default_pack():
+    """The pack every detector in this process shares (loaded on first use)."""
+    global _default_pack
+    if _default_pack is None:
+        _default_pack = load_pack()
+    return _default_pack
@@ -0,0 +1,82 @@
+import json
+
+from metrics import timer
+from rule_pack import default_pack
+
+# -------------------
+# Runtime probes
+# -------------------
+# Library -> JS expression evaluated in the page that yields the loaded version
+# (anything falsy means "not present"), from the rule pack's "runtime" entries so
+# runtime and static findings merge per library. Adding a probe costs no extra IPC.
+RUNTIME_PROBES = default_pack().runtime
+
+
+def build_probe_script(probes):
+    """One page function evaluating every probe; each probe is isolated by its own try/catch.
+
+    Probes are inlined as arrow functions (not eval/new Function) so pages with a
+    strict Content-Security-Policy still run them.
+    """
+    entries = ",\n".join(f"  {json.dumps(lib)}: () => ({expr})" for lib, expr in probes.items())
+    return (
+        "() => {\n"
+        " const probes = {\n" + entries + "\n };\n"
+        " const found = {};\n"
+        " for (const [lib, probe] of Object.entries(probes)) {\n"
+        "  try { const v = probe(); if (v) found[lib] = String(v); } catch (e) {}\n"
+        " }\n"
+        " return found;\n"
+        "}"
+    )
+
+
+PROBE_SCRIPT = build_probe_script(RUNTIME_PROBES)
+
+
+def probe_page(page):
+    """Run all probes in a single evaluate round trip; returns {library: version}."""
+    try:
+        with timer("runtime_probe"):
+            return page.evaluate(PROBE_SCRIPT) or {}
+    except Exception:
+        return {}
+
+
+async def probe_page_async(page):
+    try:
+        with timer("runtime_probe"):
+            return await page.evaluate(PROBE_SCRIPT) or {}
+    except Exception:
+        return {}
+
+
+# -------------------
+# Merge with static findings
+# -------------------
+def merge_findings(static, runtime):
+    """Combine static (library, version, source) triples with runtime {library: version}.
+
+    Returns {library: (version, [sources])}; the version seen at runtime wins
+    since that is what the page actually executed.
+    """
+    merged = {}
+    for lib, ver, source in static:
+        entry = merged.setdefault(lib, [None, []])
+        if ver and not entry[0]:
+            entry[0] = ver
+        if source not in entry[1]:
+            entry[1].append(source)
+    for lib, ver in runtime.items():
+        entry = merged.setdefault(lib, [None, []])
+        entry[0] = ver
+        entry[1].append("runtime")
+    return {lib: tuple(entry) for lib, entry in merged.items()}
+
+
+def format_merged(merged):
+    out = []
+    for lib, (ver, sources) in merged.items():
+        label = "+".join(sources)
+        out.append(f"{lib} {ver} ({label})" if ver else f"{lib} ({label})")
+    return out
@@ -0,0 +1,258 @@
+import hashlib
+import json
+import re
+import sqlite3
+import time
+
+import requests
+
+from bundle_scan import open_scanner
+from lib_matcher import SCAN_WINDOW
+from metrics import count, timer
+from ratelimit import polite_request
+
+DEFAULT_CACHE_PATH = "script_cache.sqlite"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scripts (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    sha256 TEXT NOT NULL,
+    expires REAL NOT NULL DEFAULT 0,
+    last_used REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    sha256 TEXT NOT NULL,
+    detector TEXT NOT NULL,
+    result TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (sha256, detector)
+);
+CREATE INDEX IF NOT EXISTS results_lru ON results (last_used);
+"""
+
+
+def detector_key(name, *tables):
+    """Stable key for a detector + its rule tables, so cached results expire when rules change."""
+    blob = json.dumps(tables, sort_keys=True, default=str)
+    return f"{name}:{hashlib.sha256(blob.encode()).hexdigest()[:16]}"
+
+
+def _max_age(cache_control):
+    m = re.search(r"max-age=(\d+)", cache_control or "")
+    if not m or "no-cache" in cache_control or "no-store" in cache_control:
+        return 0
+    return int(m.group(1))
+
+
+# -------------------
+# Script cache
+# -------------------
+class ScriptCache:
+    """Detection results keyed by script URL (with HTTP validators) and SHA-256 of the body."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, detector="default", max_bytes=DEFAULT_MAX_BYTES):
+        self.detector = detector
+        self.max_bytes = max_bytes
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        # URLs already validated during this run cost nothing the second time
+        self._fresh = {}
+        self.hits = self.revalidated = self.misses = 0
+
+    def close(self):
+        self.evict()
+        self.db.commit()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _entry(self, url):
+        return self.db.execute(
+            "SELECT etag, last_modified, sha256, expires FROM scripts WHERE url = ?", (url,)
+        ).fetchone()
+
+    def _result(self, sha):
+        row = self.db.execute(
+            "SELECT result FROM results WHERE sha256 = ? AND detector = ?", (sha, self.detector)
+        ).fetchone()
+        if row is None:
+            return None
+        self.db.execute(
+            "UPDATE results SET last_used = ? WHERE sha256 = ? AND detector = ?",
+            (time.time(), sha, self.detector),
+        )
+        # Commit right away so the write lock isn't held while other processes share the file
+        self.db.commit()
+        return json.loads(row[0])
+
+    def cached(self, url):
+        """Result usable without any request (seen this run, or still fresh per Cache-Control)."""
+        if url in self._fresh:
+            self.hits += 1
+            count("script_cache", result="hit")
+            return self._fresh[url]
+        entry = self._entry(url)
+        if entry and entry[3] > time.time():
+            result = self._result(entry[2])
+            if result is not None:
+                self.hits += 1
+                count("script_cache", result="hit")
+                self._fresh[url] = result
+                return result
+        return None
+
+    def conditional_headers(self, url):
+        entry = self._entry(url)
+        headers = {}
+        if entry and self._result(entry[2]) is not None:
+            if entry[0]:
+                headers["If-None-Match"] = entry[0]
+            if entry[1]:
+                headers["If-Modified-Since"] = entry[1]
+        return headers
+
+    def not_modified(self, url, resp_headers):
+        """Handle a 304: refresh validators and return the stored result."""
+        entry = self._entry(url)
+        result = self._result(entry[2]) if entry else None
+        if result is None:
+            return None
+        expires = time.time() + _max_age(resp_headers.get("cache-control"))
+        self.db.execute(
+            "UPDATE scripts SET expires = ?, last_used = ? WHERE url = ?", (expires, time.time(), url)
+        )
+        self.db.commit()
+        self.revalidated += 1
+        count("script_cache", result="revalidated")
+        self._fresh[url] = result
+        return result
+
+    def by_digest(self, url, resp_headers, sha):
+        """Stored result for body digest `sha` (same bytes seen under any URL), recorded under url."""
+        result = self._result(sha)
+        if result is not None:
+            self.hits += 1
+            count("script_cache", result="hit")
+            self._remember(url, resp_headers, sha, result)
+        return result
+
+    def store(self, url, resp_headers, sha, result):
+        """Record the scan result for a freshly downloaded body with digest `sha`.
+
+        sha is None when the body wasn't read to the end (the scan stopped
+        early): the result is then kept under the URL alone, where no digest
+        lookup can find it.
+        """
+        self.misses += 1
+        count("script_cache", result="miss")
+        key = sha or f"url:{url}"
+        blob = json.dumps(result)
+        self.db.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+            (key, self.detector, blob, len(blob) + len(key), time.time()),
+        )
+        self._remember(url, resp_headers, key, result)
+        return result
+
+    def _remember(self, url, resp_headers, sha, result):
+        # Header names are looked up lower-case: requests/aiohttp headers are
+        # case-insensitive and Playwright already lower-cases them.
+        now = time.time()
+        self.db.execute(
+            "INSERT OR REPLACE INTO scripts VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                url,
+                resp_headers.get("etag"),
+                resp_headers.get("last-modified"),
+                sha,
+                now + _max_age(resp_headers.get("cache-control")),
+                now,
+            ),
+        )
+        self._fresh[url] = result
+        self.db.commit()
+
+    def evict(self):
+        """Drop least-recently-used results until the stored size fits max_bytes."""
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        doomed = []
+        for sha, detector, size in self.db.execute(
+            "SELECT sha256, detector, size FROM results ORDER BY last_used"
+        ):
+            doomed.append((sha, detector))
+            freed += size
+            if freed >= excess:
+                break
+        self.db.executemany("DELETE FROM results WHERE sha256 = ? AND detector = ?", doomed)
+        self.db.execute("DELETE FROM scripts WHERE sha256 NOT IN (SELECT sha256 FROM results)")
+        self.db.commit()
+
+
+# -------------------
+# Fetch helpers
+# -------------------
+def scan_result(scanner, describe):
+    """Cacheable result of a finished StreamScanner or BundleScanner: describe(matches) plus the byte count."""
+    count("bytes", scanner.bytes_scanned, kind="script")
+    return {"detection": describe(scanner.finish()), "bytes_scanned": scanner.bytes_scanned}
+
+
+def scan_body(url, body, matcher, describe, cache=None, headers=None, encoding=None):
+    """scan_result() for a body already in memory, e.g. captured from the browser."""
+    sha = hashlib.sha256(body).hexdigest()
+    if cache is not None:
+        result = cache.by_digest(url, headers or {}, sha)
+        if result is not None:
+            return result
+    scanner = open_scanner(matcher, encoding=encoding, size=len(body), url=url)
+    for start in range(0, len(body), SCAN_WINDOW):
+        if scanner.feed(body[start:start + SCAN_WINDOW]):
+            break
+    result = scan_result(scanner, describe)
+    if cache is not None:
+        cache.store(url, headers or {}, sha, result)
+    return result
+
+
+def fetch_and_scan(url, matcher, describe, cache=None, timeout=5):
+    """Stream a script through `matcher` and return scan_result(), or None if it isn't a reachable JS file."""
+    with timer("fetch_script"):
+        if cache is not None:
+            result = cache.cached(url)
+            if result is not None:
+                return result
+        headers = cache.conditional_headers(url) if cache is not None else {}
+        try:
+            with polite_request("GET", url, timeout=timeout, headers=headers, stream=True) as resp:
+                if resp.status_code == 304 and cache is not None:
+                    return cache.not_modified(url, resp.headers)
+                if not (resp.ok and "javascript" in resp.headers.get("Content-Type", "")):
+                    return None
+                # Large bundles are read whole and scanned in parallel segments
+                scanner = open_scanner(matcher, encoding=resp.encoding, url=url)
+                for chunk in resp.iter_content(SCAN_WINDOW):
+                    if scanner.feed(chunk):
+                        sha = None  # stopped early: the digest would only cover part of the body
+                        break
+                else:
+                    sha = scanner.sha256
+        except requests.exceptions.RequestException:
+            return None
+        result = scan_result(scanner, describe)
+        if cache is not None:
+            cache.store(url, resp.headers, sha, result)
+        return result
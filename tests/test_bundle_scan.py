@@ -0,0 +1,63 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bundle_scan import BUNDLE_THRESHOLD, SEGMENT_SIZE, BundleScanner, configure_bundles, open_scanner, scan_bundle, split_bundle
+from lib_matcher import SCAN_OVERLAP, LibraryMatcher
+
+MATCHER = LibraryMatcher({"jquery": [r"jQuery v(\d+(?:\.\d+)+)"]})
+
+
+def _bundle_with_banner_at(start):
+    """Filler with no module boundary around a "jQuery v3.6.10" banner at offset `start`."""
+    head = ("var a=1;" * (start // 8 + 1))[:start]
+    return head + "jQuery v3.6.10;" + "var b=2;" * (SEGMENT_SIZE // 8)
+
+
+def test_version_straddling_segment_end():
+    configure_bundles(workers=1, source_maps=False)
+    # The first segment (with its overlap) ends between "3.6.1" and "0"
+    text = _bundle_with_banner_at(SEGMENT_SIZE + SCAN_OVERLAP - len("jQuery v3.6.1"))
+    first = split_bundle(text)[0][1]
+    assert first.endswith("jQuery v3.6.1")
+    assert [m.version for m in scan_bundle(text, MATCHER)] == ["3.6.10"]
+
+
+def test_version_inside_one_segment():
+    configure_bundles(workers=1, source_maps=False)
+    text = _bundle_with_banner_at(SEGMENT_SIZE // 2)
+    matches = scan_bundle(text, MATCHER)
+    assert [(m.version, m.end) for m in matches] == [("3.6.10", SEGMENT_SIZE // 2 + len("jQuery v3.6.10"))]
+
+
+def _feed(scanner, text, size=1000):
+    body = text.encode()
+    for start in range(0, len(body), size):
+        if scanner.feed(body[start:start + size]):
+            break
+    return [m.version for m in scanner.finish()]
+
+
+def test_bundle_decided_on_decoded_size():
+    configure_bundles(workers=1, source_maps=False, threshold=SEGMENT_SIZE)
+    try:
+        large = open_scanner(MATCHER)
+        assert _feed(large, _bundle_with_banner_at(SEGMENT_SIZE)) == ["3.6.10"]
+        assert large.bundle
+        small = open_scanner(MATCHER)
+        assert _feed(small, "jQuery v3.6.10;") == ["3.6.10"]
+        assert not small.bundle
+    finally:
+        configure_bundles(threshold=BUNDLE_THRESHOLD)
+
+
+def test_version_straddling_max_bytes():
+    configure_bundles(workers=1, source_maps=False, threshold=100_000)
+    try:
+        scanner = BundleScanner(MATCHER, max_bytes=300_000)
+        # The buffered part ends between "3.6.1" and "0"; the rest is streamed
+        text = _bundle_with_banner_at(300_000 - len("jQuery v3.6.1"))
+        assert _feed(scanner, text) == ["3.6.10"]
+    finally:
+        configure_bundles(threshold=BUNDLE_THRESHOLD)
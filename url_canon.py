@@ -0,0 +1,137 @@
+import posixpath
+import re
+from urllib.parse import quote, unquote_plus, urldefrag, urljoin, urlsplit, urlunsplit
+
+from html_extract import extract_page
+
+try:
+    import tldextract  # optional: pip install tldextract (full public suffix list)
+except ImportError:
+    tldextract = None
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Query parameters that only track the visitor and never change the page
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "_hsenc", "_hsmi", "igshid", "ref_src", "spm",
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_")
+
+# Second-level labels under which registrations happen one level deeper
+# (example.co.uk); only used when tldextract isn't installed.
+MULTI_LABEL_SUFFIXES = {"ac", "co", "com", "edu", "gov", "govt", "net", "ne", "or", "org", "gob", "mil", "nic"}
+
+# Percent-escapes of unreserved characters are decoded, the rest are upper-cased
+_ESCAPE = re.compile(r"%[0-9A-Fa-f]{2}")
+_UNRESERVED = set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+
+
+def _normalize_escapes(part):
+    def fix(m):
+        ch = chr(int(m.group(0)[1:], 16))
+        return ch if ch in _UNRESERVED else m.group(0).upper()
+    return _ESCAPE.sub(fix, part)
+
+
+def _normalize_path(path):
+    if not path:
+        return "/"
+    path = _normalize_escapes(quote(path, safe="/%:@!$&'()*+,;=-._~"))
+    trailing = path.endswith("/")
+    path = posixpath.normpath(path)
+    if path.startswith("//"):  # normpath keeps a leading double slash
+        path = "/" + path.lstrip("/")
+    return path + "/" if trailing and path != "/" else path
+
+
+def is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def canonicalize(url, sort_query=True, strip_tracking=True, strip_trailing_slash=True):
+    """Canonical form of an http(s) URL, so equivalent spellings dedupe to one frontier entry.
+
+    The canonical form is a key only: servers may treat /docs/ and /docs
+    differently, so pages are fetched as linked.
+
+    Drops the fragment and default port, lower-cases scheme and host, resolves
+    dot segments and normalizes percent-escapes. Optionally sorts the query
+    parameters, removes tracking parameters and strips a trailing slash.
+    Anything that isn't http(s) is returned unchanged.
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return url
+
+    host = parts.hostname.rstrip(".")
+    if ":" in host:
+        host = f"[{host}]"  # IPv6 literal
+    netloc = host if port in (None, DEFAULT_PORTS[scheme]) else f"{host}:{port}"
+    if parts.username:
+        auth = parts.username + (f":{parts.password}" if parts.password else "")
+        netloc = f"{auth}@{netloc}"
+
+    path = _normalize_path(parts.path)
+    if strip_trailing_slash and len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/") or "/"
+
+    query = parts.query
+    if query:
+        # Raw "k=v" pairs: decoding and re-encoding would change what the server sees (%2B vs +, "flag" vs "flag=")
+        params = [_normalize_escapes(quote(p, safe="/?:@!$'()*+,;=%-._~")) for p in query.split("&") if p]
+        if strip_tracking:
+            params = [p for p in params if not is_tracking_param(unquote_plus(p.partition("=")[0]))]
+        if sort_query:
+            # By name only: the sort is stable, so repeated keys (a=2&a=1) keep their order
+            params.sort(key=lambda p: p.partition("=")[0])
+        query = "&".join(params)
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def canonical_links(page_url, hrefs, **options):
+    """[(link, key)] for the absolute http(s) hrefs (relative to page_url), in order, each key at most once.
+
+    link is the URL as written minus its fragment (what to fetch), key its
+    canonical form (what to dedupe on).
+    """
+    links = []
+    seen = set()
+    for href in hrefs:
+        link = urldefrag(urljoin(page_url, href))[0]
+        key = canonicalize(link, **options)
+        if key not in seen and key.startswith(("http://", "https://")):
+            seen.add(key)
+            links.append((link, key))
+    return links
+
+
+def internal_links(page_url, hrefs, domain, **options):
+    """canonical_links() on the crawled host only."""
+    return [(link, key) for link, key in canonical_links(page_url, hrefs, **options)
+            if urlsplit(key).netloc == domain]
+
+
+def links_from_html(page_url, html, **options):
+    """canonical_links() of an HTML document, in order (honours <base href>)."""
+    return canonical_links(page_url, extract_page(html, page_url).links, **options)
+
+
+def registered_domain(url):
+    """Registrable domain of a URL's host (www.shop.example.co.uk -> example.co.uk)."""
+    host = (urlsplit(url if "//" in url else "//" + url).hostname or "").rstrip(".")
+    if not host or host.replace(".", "").isdigit() or ":" in host:
+        return host  # IP address
+    if tldextract is not None:
+        ext = tldextract.extract(host)
+        return ext.registered_domain or host
+    labels = host.split(".")
+    if len(labels) > 2 and len(labels[-1]) == 2 and labels[-2] in MULTI_LABEL_SUFFIXES:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
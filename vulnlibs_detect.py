@@ -1,37 +1,30 @@
-import requests
-from urllib.parse import urljoin, urlparse
-import re
-import csv
-import time
-from collections import deque
-from playwright.sync_api import sync_playwright
-from packaging import version  # pip install packaging
+import argparse
+from urllib.parse import urlparse
+import asyncio
+from advisory_db import default_db, index_fingerprint, parse_version
+from browser_pool import LazyContext, capture_sync, goto_sync, rendered_links_sync
+from bundle_scan import add_bundle_arguments, configure_bundles
+from escalation import Escalator, add_escalation_arguments
+from frontier import MemoryFrontier, open_frontier
+from html_extract import extract_page
+from inventory import Inventory, summary_line
+from metrics import add_metrics_arguments, count, gauge, start_metrics, timer
+from ratelimit import add_rate_arguments, configure_rate, polite_request
+from report_writers import open_writer
+from rule_pack import default_pack
+from script_cache import ScriptCache, detector_key, fetch_and_scan, scan_body
+from url_canon import canonicalize, internal_links
 
 # -------------------
 # Library patterns
 # -------------------
-LIBRARY_PATTERNS = {
-    "jQuery": [r"jQuery\.fn\.jquery\s*=\s*['\"](\d+\.\d+\.\d+)['\"]", r"jQuery v(\d+\.\d+\.\d+)"],
-    "Bootstrap": [r"bootstrap\.Tooltip\.VERSION\s*=\s*['\"](\d+\.\d+\.\d+)['\"]"],
-    "React": [r"React\.version\s*=\s*['\"](\d+\.\d+\.\d+)['\"]", r"React\.createElement"],
-    "AngularJS": [r"angular\.version\.full\s*=\s*['\"](\d+\.\d+\.\d+)['\"]", r"angular\.module"],
-    "Vue": [r"Vue\.version\s*=\s*['\"](\d+\.\d+\.\d+)['\"]", r"Vue\.component"],
-    "Moment.js": [r"moment\s*=\s*.*?(\d+\.\d+\.\d+)"],
-    "Lodash": [r"lodash\.VERSION\s*=\s*['\"](\d+\.\d+\.\d+)['\"]", r"_\."],
-}
-
-# Latest versions (example)
-LATEST_VERSIONS = {
-    "jQuery": "3.7.1",
-    "Bootstrap": "5.3.2",
-    "React": "18.3.0",
-    "AngularJS": "1.8.3",
-    "Vue": "3.3.4",
-    "Moment.js": "2.30.0",
-    "Lodash": "4.17.21",
-}
+# Signatures and latest versions come from the shared rule pack (rules/libraries.json)
+PACK = default_pack()
+LIBRARY_PATTERNS = PACK.content_patterns()
+LATEST_VERSIONS = PACK.latest
 
-# Vulnerabilities (example, extendable)
+# Vulnerabilities (example, extendable); used when no offline advisory index
+# has been imported (see advisory_db.py)
 VULNERABILITIES = {
     "jQuery": {"3.6.0": ["CVE-2022-1234"]},
     "Bootstrap": {"4.5.0": ["CVE-2020-0001"]},
@@ -44,98 +37,296 @@ VULNERABILITIES = {
 def check_outdated(lib_name, detected_version):
     latest = LATEST_VERSIONS.get(lib_name)
     if latest and detected_version:
-        if version.parse(detected_version) < version.parse(latest):
+        detected, latest_parsed = parse_version(detected_version), parse_version(latest)
+        if detected is not None and detected < latest_parsed:
             return f"Outdated (latest {latest})"
     return "Up-to-date"
 
 def check_vulnerable(lib_name, detected_version):
+    db = default_db()
+    if db is not None:
+        # Range-based match against the offline OSV/GitHub advisory index
+        return ",".join(db.vulnerability_ids(lib_name, detected_version))
     vulns = VULNERABILITIES.get(lib_name, {})
     return ",".join(vulns.get(detected_version, []))
 
 # -------------------
 # Detect libraries in JS content
 # -------------------
-def detect_from_content(js_code: str):
+CONTENT_MATCHER = PACK.matcher("content")
+
+def describe_matches(matches):
+    # (labels, vulnerabilities, [library, version] pairs); the labels are for display only
     findings = []
     vulnerabilities = []
-    for lib, patterns in LIBRARY_PATTERNS.items():
-        for pat in patterns:
-            m = re.search(pat, js_code, re.IGNORECASE)
-            if m:
-                ver = m.group(1) if len(m.groups()) >= 1 else None
-                status = check_outdated(lib, ver) if ver else "Detected"
-                findings.append(f"{lib} {ver or ''} ({status})")
-                if ver:
-                    vuls = check_vulnerable(lib, ver)
-                    if vuls:
-                        vulnerabilities.append(f"{lib} {ver}: {vuls}")
-                else:
-                    # No version, just detected
-                    vulnerabilities.append("")
-    return findings, vulnerabilities
+    pairs = []
+    for m in matches:
+        lib, ver = m.lib, m.version
+        if [lib, ver] in pairs:
+            continue  # several signatures of one library found the same thing
+        pairs.append([lib, ver])
+        status = check_outdated(lib, ver) if ver else "Detected"
+        findings.append(f"{lib} {ver or ''} ({status})")
+        if ver:
+            vuls = check_vulnerable(lib, ver)
+            if vuls:
+                vulnerabilities.append(f"{lib} {ver}: {vuls}")
+        else:
+            # No version, just detected
+            vulnerabilities.append("")
+    return findings, vulnerabilities, pairs
+
+def detect_from_content(js_code: str):
+    return describe_matches(CONTENT_MATCHER.scan(js_code))
+
+# Cache key for script detections; changes whenever the rule pack or tables do
+DETECTOR = detector_key("vulnlibs-pairs", PACK.fingerprint, VULNERABILITIES, index_fingerprint())
+
+def fetch_script(js_url, cache=None):
+    # Streams the whole file (no truncation) and stops once every library is resolved
+    return fetch_and_scan(js_url, CONTENT_MATCHER, describe_matches, cache)
+
+def scan_captured(scripts, cache=None):
+    # Scripts captured during navigation: scan the bytes the browser received
+    return {
+        js_url: scan_body(js_url, body, CONTENT_MATCHER, describe_matches, cache, headers)
+        for js_url, body, headers in scripts
+    }
+
+def content_result(js_code):
+    return {"detection": detect_from_content(js_code), "bytes_scanned": len(js_code.encode())}
+
+def unversioned(result):
+    # The script couldn't be scanned, or a library in it was found without a version ("Detected")
+    return result is None or any(ver is None for _, ver in result["detection"][2])
+
+def detection_row(page_url, script_src, result, runtime=False):
+    if not result:
+        return None
+    libs, vulns, pairs = result["detection"]
+    if not libs:
+        return None
+    if runtime:
+        source = "runtime"
+    else:
+        source = "inline" if script_src == "[inline]" else "content"
+    return {
+        "page_url": page_url,
+        "script_src": script_src,
+        "libs_from_content": ",".join(libs),
+        "runtime_libs": ",".join(libs) if runtime else "",
+        "vulnerabilities": ",".join(vulns),
+        "bytes_scanned": result["bytes_scanned"],
+        # [library, version, source] triples for the inventory
+        "findings": [[lib, ver, source] for lib, ver in pairs],
+    }
+
+# -------------------
+# Inventory
+# -------------------
+def resolve_library(lib, ver):
+    if not ver:
+        return "Detected", ""
+    return check_outdated(lib, ver), check_vulnerable(lib, ver)
+
+def new_inventory(keep_pages=False, group_by=None):
+    # One record per (library, version, script URL); status and vulnerabilities looked up once per version
+    return Inventory(resolve_library, keep_pages=keep_pages, group_by=group_by)
 
 # -------------------
 # Crawl & detect
 # -------------------
-def crawl_and_detect(start_url, max_pages=50):
-    visited = set()
-    queue = deque([start_url])
-    results = []
-    domain = urlparse(start_url).netloc
+def runtime_rows_sync(context, url, cache=None, links=None):
+    # Runtime detection using network interception; `links` collects the rendered page's links
+    rows = []
+    js_files = []
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)  # headless=True for normal use
-        context = browser.new_context(user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+    def capture_js(request):
+        if request.resource_type == "script":
+            js_files.append(request.url)
 
-        while queue and len(visited) < max_pages:
-            url = queue.popleft()
-            if url in visited:
-                continue
-            visited.add(url)
-            print(f"[{len(visited)}/{max_pages}] Visiting: {url}")
+    try:
+        page = context.new_page()
+        page.on("request", capture_js)
+        goto_sync(page, url, timeout=60000, wait_until="networkidle")
+        if links is not None:
+            links.extend(rendered_links_sync(page))
+        # Fetch JS files captured by network requests
+        for js_url in js_files:
+            row = detection_row(url, js_url, fetch_script(js_url, cache), runtime=True)
+            if row:
+                rows.append(row)
+        page.close()
+    except Exception as e:
+        print(f"Runtime detection failed for {url}: {e}")
+        print("⚠️ Skipping runtime detection, continuing with script/inline detection.")
+    return rows
+
+def visit_page_sync(context, url, cache=None, single_nav=False, escalator=None):
+    """Detect libraries on one page; returns (rows, parsed) with parsed None if the page was skipped.
 
-            # Fetch HTML with requests
+    With an escalator, the browser only visits the page when the static pass leaves something open.
+    """
+    rows = []
+    captured = {}
+    if single_nav:
+        # One browser navigation yields the HTML and every script body
+        try:
+            page = context.new_page()
             try:
-                resp = requests.get(url, timeout=10)
+                html, scripts = capture_sync(page, url)
+                served_url = page.url
+            finally:
+                page.close()
+        except Exception as e:
+            print(f"Navigation failed for {url}: {e}")
+            return rows, None
+        if html is None:
+            return rows, None
+        captured = scan_captured(scripts, cache)
+    else:
+        # Fetch HTML with requests
+        try:
+            with timer("fetch_page"):
+                resp = polite_request("GET", url, timeout=10)
                 if "text/html" not in resp.headers.get("Content-Type", ""):
-                    continue
+                    return rows, None
                 html = resp.text
-            except Exception as e:
-                print(f"Request failed for {url}: {e}")
-                continue
-
-            # Parse <script> tags
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(html, "html.parser")
-            for script in soup.find_all("script"):
-                src = script.get("src")
-                if src:
-                    abs_src = urljoin(url, src)
-                    try:
-                        js_resp = requests.get(abs_src, timeout=5)
-                        if js_resp.ok and "javascript" in js_resp.headers.get("Content-Type", ""):
-                            libs, vulns = detect_from_content(js_resp.text[:5000])
-                            if libs:
-                                results.append({
-                                    "page_url": url,
-                                    "script_src": abs_src,
-                                    "libs_from_content": ",".join(libs),
-                                    "runtime_libs": "",
-                                    "vulnerabilities": ",".join(vulns),
-                                })
-                    except:
-                        pass
+                served_url = resp.url
+            count("bytes", len(resp.content), kind="page")
+        except Exception as e:
+            print(f"Request failed for {url}: {e}")
+            return rows, None
+
+    # Scripts (external, inline, module and preloaded) in one pass over the HTML,
+    # resolved against the URL that was served (after any redirect)
+    with timer("parse"):
+        parsed = extract_page(html, served_url)
+    unresolved = []
+    for script in parsed.scripts:
+        if script.src:
+            result = captured[script.src] if script.src in captured else fetch_script(script.src, cache)
+        else:
+            result = content_result(script.code)
+        row = detection_row(url, script.src or "[inline]", result)
+        if row:
+            rows.append(row)
+        if unversioned(result):
+            unresolved.append(script.src or "[inline]")
+
+    if single_nav:
+        # Runtime rows come from the same navigation, nothing is fetched twice
+        for js_url, result in captured.items():
+            row = detection_row(url, js_url, result, runtime=True)
+            if row:
+                rows.append(row)
+    elif escalator is None:
+        rows.extend(runtime_rows_sync(context, url, cache))
+    elif escalator.escalate(url, parsed, unresolved):
+        rows.extend(runtime_rows_sync(context, url, cache, links=parsed.links))
+    return rows, parsed
+
+def crawl_and_detect(start_url, max_pages=50, cache=None, single_nav=False, frontier=None, escalator=None):
+    from playwright.sync_api import sync_playwright
+
+    frontier = frontier if frontier is not None else MemoryFrontier()
+    # Pages are fetched as linked; the canonical form only dedupes the frontier
+    start_key = canonicalize(start_url)
+    frontier.push(start_url, start_key)
+    domain = urlparse(start_key).netloc
+
+    with sync_playwright() as p:
+        # Chromium starts with the first page that needs it; headless=True for normal use
+        context = LazyContext(p, headless=False, user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+
+        while frontier.visited_count() < max_pages:
+            url = frontier.pop()
+            if url is None:
+                break
+            print(f"[{frontier.visited_count()}/{max_pages}] Visiting: {url}")
+
+            count("pages")
+            with timer("page"):
+                rows, parsed = visit_page_sync(context, url, cache, single_nav, escalator)
+
+            # Enqueue new internal links
+            if parsed is not None:
+                for next_url, key in internal_links(url, parsed.links, domain):
+                    frontier.push(next_url, key)
+            gauge("frontier_queued", frontier.queued_count())
+            frontier.complete(url, rows)
+
+        context.close()
+    if escalator is not None:
+        print(f"🧭 Browser escalation: {escalator.summary()}")
+    return frontier.results()
+
+# -------------------
+# Async crawl & detect
+# -------------------
+async def crawl_and_detect_async(start_url, max_pages=50, concurrency=20, per_host=4, cache=None,
+                                 browsers=4, wait_until="domcontentloaded", settle_ms=1000, single_nav=False,
+                                 frontier=None, escalator=None):
+    from async_crawl import AsyncCrawler, USER_AGENT
+    from browser_pool import BrowserPool, rendered_links_async
+
+    # Tiered crawls start Chromium only when the first page is escalated
+    pool = BrowserPool(size=browsers, user_agent=USER_AGENT, wait_until=wait_until, settle_ms=settle_ms,
+                       lazy=escalator is not None)
+    async with pool:
+        # single_nav: scan results of the scripts each page's navigation received
+        captured_by_page = {}
+
+        async def navigate_page(url):
+            async with pool.page() as page:
+                html, scripts = await pool.capture(page, url)
+                served_url = page.url
+            if html is not None:
+                captured_by_page[url] = scan_captured(scripts, cache)
+            return html, served_url
+
+        async def scan_scripts(crawler, url, srcs, runtime=False, captured=None, unresolved=None):
+            scans = dict(captured or {})
+            missing = [src for src in srcs if src not in scans]
+            fetched = await asyncio.gather(
+                *(crawler.fetch_and_scan(src, CONTENT_MATCHER, describe_matches) for src in missing)
+            )
+            scans.update(zip(missing, fetched))
+            rows = []
+            for src in srcs:
+                row = detection_row(url, src, scans[src], runtime=runtime)
+                if row:
+                    rows.append(row)
+                if unresolved is not None and unversioned(scans[src]):
+                    unresolved.append(src)
+            return rows
+
+        async def process_page(crawler, url, parsed):
+            srcs = []
+            rows = []
+            unresolved = []
+            for script in parsed.scripts:
+                if script.src:
+                    srcs.append(script.src)
                 else:
-                    inline_code = script.string or ""
-                    libs, vulns = detect_from_content(inline_code)
-                    if libs:
-                        results.append({
-                            "page_url": url,
-                            "script_src": "[inline]",
-                            "libs_from_content": ",".join(libs),
-                            "runtime_libs": "",
-                            "vulnerabilities": ",".join(vulns),
-                        })
+                    result = content_result(script.code)
+                    row = detection_row(url, "[inline]", result)
+                    if row:
+                        rows.append(row)
+                    if unversioned(result):
+                        unresolved.append("[inline]")
+            if single_nav:
+                captured = captured_by_page.pop(url, {})
+                rows[:0] = await scan_scripts(crawler, url, srcs, captured=captured)
+                # Runtime rows come from the same navigation, nothing is fetched twice
+                for js_url, result in captured.items():
+                    row = detection_row(url, js_url, result, runtime=True)
+                    if row:
+                        rows.append(row)
+                return rows
+            rows[:0] = await scan_scripts(crawler, url, srcs, unresolved=unresolved)
+            if escalator is not None and not escalator.escalate(url, parsed, unresolved):
+                return rows
 
             # Runtime detection using network interception
             js_files = []
@@ -145,79 +336,128 @@ def crawl_and_detect(start_url, max_pages=50):
                     js_files.append(request.url)
 
             try:
-                page = context.new_page()
-                page.on("request", capture_js)
-                page.goto(url, timeout=60000, wait_until="networkidle")
-                # Fetch JS files captured by network requests
-                for js_url in js_files:
+                async with pool.page() as page:
+                    page.on("request", capture_js)
                     try:
-                        js_resp = requests.get(js_url, timeout=5)
-                        if js_resp.ok and "javascript" in js_resp.headers.get("Content-Type", ""):
-                            libs, vulns = detect_from_content(js_resp.text[:5000])
-                            if libs:
-                                results.append({
-                                    "page_url": url,
-                                    "script_src": js_url,
-                                    "libs_from_content": ",".join(libs),
-                                    "runtime_libs": ",".join(libs),
-                                    "vulnerabilities": ",".join(vulns),
-                                })
-                    except:
-                        pass
-                page.close()
+                        await pool.navigate(page, url)
+                    finally:
+                        page.remove_listener("request", capture_js)
+                    if escalator is not None:
+                        parsed.links.extend(await rendered_links_async(page))
             except Exception as e:
                 print(f"Runtime detection failed for {url}: {e}")
                 print("⚠️ Skipping runtime detection, continuing with script/inline detection.")
+            rows.extend(await scan_scripts(crawler, url, js_files, runtime=True))
+            return rows
 
-            # Enqueue new internal links
-            for a in soup.find_all("a", href=True):
-                next_url = urljoin(url, a["href"])
-                if urlparse(next_url).netloc == domain and next_url not in visited:
-                    if next_url.startswith("http"):
-                        queue.append(next_url)
-
-            time.sleep(1)
-
-        browser.close()
+        crawler = AsyncCrawler(concurrency=concurrency, per_host=per_host, cache=cache)
+        results = await crawler.crawl(start_url, max_pages, process_page,
+                                      fetch_page=navigate_page if single_nav else None, frontier=frontier)
+    if escalator is not None:
+        print(f"🧭 Browser escalation: {escalator.summary()}")
     return results
 
-# -------------------
-# Save CSV
-# -------------------
-def save_csv(findings, filename="findings.csv"):
-    if not findings:
-        print("⚠️ No findings to save.")
-        return
-    keys = findings[0].keys()
-    with open(filename, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=keys)
-        writer.writeheader()
-        writer.writerows(findings)
-    print(f"✅ Results saved to {filename}")
+def run_crawl(start_url, max_pages=50, use_async=True, cache=None, single_nav=False, frontier=None,
+              escalator=None):
+    if use_async:
+        try:
+            return asyncio.run(crawl_and_detect_async(start_url, max_pages=max_pages, cache=cache,
+                                                      single_nav=single_nav, frontier=frontier,
+                                                      escalator=escalator))
+        except ImportError as e:
+            print(f"⚠️ Async engine unavailable ({e}), falling back to sequential crawl.")
+    return crawl_and_detect(start_url, max_pages=max_pages, cache=cache, single_nav=single_nav,
+                            frontier=frontier, escalator=escalator)
 
 # -------------------
 # Main
 # -------------------
+def parse_args():
+    parser = argparse.ArgumentParser(description="Detect vulnerable and outdated JS libraries on a site")
+    parser.add_argument("url", nargs="?", help="starting URL (prompted for when omitted)")
+    parser.add_argument("--max-pages", type=int)
+    parser.add_argument("--sequential", action="store_true", help="use the sequential crawl instead of the async engine")
+    parser.add_argument("--single-nav", action="store_true", help="browser fetches page + scripts once")
+    parser.add_argument("--state", help="SQLite file holding the crawl frontier and results (makes the crawl resumable)")
+    parser.add_argument("--resume", action="store_true", help="continue the crawl stored in --state")
+    parser.add_argument("-o", "--output", default="findings.csv",
+                        help="report file; .csv, .jsonl or .xlsx (one row per library, version and script)")
+    parser.add_argument("--per-page", action="store_true",
+                        help="report one row per page, script and library instead of the aggregated inventory")
+    add_rate_arguments(parser)
+    add_bundle_arguments(parser)
+    add_escalation_arguments(parser)
+    add_metrics_arguments(parser)
+    parser.add_argument("--bloom", type=int, metavar="N",
+                        help="dedupe in-memory crawls with a Bloom filter sized for N URLs (bounded memory)")
+    args = parser.parse_args()
+    if args.resume and not args.state:
+        parser.error("--resume needs --state")
+    if args.tiered and args.single_nav:
+        parser.error("--tiered and --single-nav don't combine (single-nav renders every page)")
+    return args
+
 def main():
-    start_url = input("Enter the starting URL (include https://): ").strip()
-    if not start_url:
-        print("No URL provided. Exiting.")
-        return
-    try:
-        max_pages = int(input("Max pages to crawl (e.g. 50): ").strip() or "50")
-    except ValueError:
-        max_pages = 50
+    args = parse_args()
+    configure_rate(max_rate=args.max_rate, min_rate=args.min_rate)
+    configure_bundles(workers=args.bundle_workers, source_maps=args.source_maps)
+    start_metrics(args)
+    start_url, max_pages = args.url, args.max_pages
+    use_async, single_nav = not args.sequential, args.single_nav
+    if not start_url and not args.resume:
+        start_url = input("Enter the starting URL (include https://): ").strip()
+        if not start_url:
+            print("No URL provided. Exiting.")
+            return
+        try:
+            max_pages = int(input("Max pages to crawl (e.g. 50): ").strip() or "50")
+        except ValueError:
+            max_pages = 50
+        use_async = input("Use async crawl engine? (Y/n): ").strip().lower() != "n"
+        single_nav = input("Single-navigation capture (browser fetches page + scripts once)? (y/N): ").strip().lower() == "y"
 
+    if not args.resume:
+        max_pages = max_pages or 50
+    writer = open_writer(args.output, preview=30)
+    inventory = new_inventory(keep_pages=args.per_page)
+    try:
+        frontier, start_url, max_pages = open_frontier(args.state, start_url, max_pages, args.resume,
+                                                       args.bloom, inventory)
+    except ValueError as e:
+        raise SystemExit(str(e))
     print(f"Starting crawl at {start_url} (max pages={max_pages}). Ensure permission to scan this target.")
-    findings = crawl_and_detect(start_url, max_pages=max_pages)
-    if findings:
+    try:
+        with ScriptCache(detector=DETECTOR) as cache:
+            escalator = Escalator(samples=args.template_samples) if args.tiered and not single_nav else None
+            run_crawl(start_url, max_pages=max_pages, use_async=use_async, cache=cache,
+                      single_nav=single_nav, frontier=frontier, escalator=escalator)
+            print(f"Script cache: {cache.hits} hits, {cache.revalidated} revalidated (304), {cache.misses} new")
+            print(f"Frontier: {frontier.visited_count()} pages visited, {frontier.duplicates} duplicate links skipped")
+        if args.state:
+            # Rows live in the state file so they survive a resume; aggregate them in one pass
+            inventory.write_rows(frontier.iter_results())
+    except KeyboardInterrupt:
+        frontier.close()
+        if args.state:
+            writer.close()
+            print(f"\n⏸️ Interrupted; progress saved. Continue with: --state {args.state} --resume")
+        else:
+            inventory.export(writer, per_page=args.per_page)
+            writer.close()
+            print(f"\n⏸️ Interrupted; findings so far written to {args.output}")
+        return
+    frontier.close()
+    inventory.export(writer, per_page=args.per_page)
+    writer.close()
+    print(f"📦 Inventory: {inventory.summary()}")
+    if writer.preview:
         print("\nSummary (first 30 rows):")
-        for row in findings[:30]:
-            print(f"{row['page_url']} | content_libs:{row['libs_from_content'] or 'NONE'} "
-                  f"| runtime:{row['runtime_libs'] or 'NONE'} "
-                  f"| vulnerabilities:{row['vulnerabilities'] or 'NONE'} "
-                  f"| src:{row['script_src'][:80]}")
-    save_csv(findings)
+        for row in writer.preview:
+            print(summary_line(row))
+    if writer.rows:
+        print(f"✅ {writer.rows} results saved to {args.output}")
+    else:
+        print("⚠️ No findings to save.")
 
 if __name__ == "__main__":
     main()